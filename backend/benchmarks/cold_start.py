@@ -0,0 +1,70 @@
+"""
+Cold start time: from launching the server to its first 200.
+
+Starts the given command, polls --path every --interval seconds until it
+answers 200 and prints the elapsed time, then stops the server. Repeat with
+--runs to get the best and median. Compare the boot modes of
+docker/django/start (in the container, or locally with APP_HOME and the
+build-time static folder in place):
+
+    python benchmarks/cold_start.py -- env BOOT_MODE=development /start
+    python benchmarks/cold_start.py -- env BOOT_MODE=production /start
+"""
+
+import argparse
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+
+def first_ok(command, url, interval, timeout):
+    start = time.perf_counter()
+    # own process group, so gunicorn and its workers are stopped together
+    server = subprocess.Popen(
+        command,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                sys.exit(f"server exited with {server.returncode} before answering")
+            try:
+                with urllib.request.urlopen(url, timeout=interval) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+            time.sleep(interval)
+        sys.exit(f"no 200 from {url} within {timeout}s")
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/metrics")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("command", nargs="+")
+    args = parser.parse_args()
+
+    url = args.url.rstrip("/") + args.path
+    runs = []
+    for i in range(args.runs):
+        runs.append(first_ok(args.command, url, args.interval, args.timeout))
+        print(f"run {i + 1}: {runs[-1]:.2f}s")
+    print(f"best {min(runs):.2f}s  median {statistics.median(runs):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Small stdlib-only helpers shared by the HTTP benchmark scripts in this
+folder. They talk to an already running server, so the same script can be
+pointed at the WSGI and the ASGI deployment.
+"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def request(base_url, method, path, data=None, token=None):
+    """Sends one request and returns (status, seconds, parsed json or None)."""
+    body = json.dumps(data).encode() if data is not None else None
+    req = urllib.request.Request(base_url.rstrip("/") + path, data=body, method=method)
+    req.add_header("Content-Type", "application/json")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            status, payload = resp.status, resp.read()
+    except urllib.error.HTTPError as e:
+        status, payload = e.code, e.read()
+    elapsed = time.perf_counter() - start
+    try:
+        parsed = json.loads(payload) if payload else None
+    except ValueError:
+        parsed = None
+    return status, elapsed, parsed
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_clients(clients, duration, task):
+    """
+    Runs `task()` in a loop on `clients` threads for `duration` seconds and
+    returns the list of (status, seconds) results.
+    """
+    results, lock = [], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            status, elapsed, _ = task()
+            with lock:
+                results.append((status, elapsed))
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def summarize(name, results, duration):
+    latencies = [elapsed for _, elapsed in results]
+    errors = sum(1 for status, _ in results if status >= 400)
+    print(
+        f"{name:<24} {len(results) / duration:8.1f} req/s  "
+        f"p50 {percentile(latencies, 50) * 1000:8.1f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:8.1f} ms  "
+        f"errors {errors}"
+    )
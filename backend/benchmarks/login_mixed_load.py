@@ -0,0 +1,61 @@
+"""
+Login throughput versus API latency under mixed load.
+
+Keeps --login-clients threads logging in continuously while --api-clients
+threads call a cheap authenticated endpoint, and reports both. Run it once
+against the default deployment and once with ASYNC_AUTH_VIEWS=True (ASGI)
+to see how much hashing still stalls the rest of the API:
+
+    python benchmarks/login_mixed_load.py --url http://localhost:8000 \
+        --email bench@example.com --password bench-password
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from common import request, run_clients, summarize  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="bench@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--login-clients", type=int, default=8)
+    parser.add_argument("--api-clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+
+    credentials = {"email": args.email, "password": args.password}
+    status, _, body = request(args.url, "POST", "/api/auth/login/", credentials)
+    if status == 401:
+        signup = {**credentials, "name": "Bench"}
+        status, _, body = request(args.url, "POST", "/api/auth/signup/", signup)
+    if status >= 400:
+        sys.exit(f"could not log in the benchmark user: {status} {body}")
+    token = body["access"]
+
+    # access tokens expire after ACCESS_TOKEN_LIFETIME (30s), keep --duration below it
+    login_threads, logins = run_clients(
+        args.login_clients,
+        args.duration,
+        lambda: request(args.url, "POST", "/api/auth/login/", credentials),
+    )
+    api_threads, api_calls = run_clients(
+        args.api_clients,
+        args.duration,
+        lambda: request(args.url, "GET", "/api/profile/", token=token),
+    )
+    for t in login_threads + api_threads:
+        t.join()
+
+    print(f"{args.duration:.0f}s against {args.url}")
+    summarize("login", logins, args.duration)
+    summarize("profile (under load)", api_calls, args.duration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Latency and throughput of the read-heavy endpoints, WSGI versus ASGI.
+
+Seeds a group with --members members and --expenses expenses for the
+benchmark user (once; later runs reuse it), then keeps --clients threads
+calling the group list, expense list, balances and suggested settlements
+endpoints and reports requests per second, p50 and p99 for each. Run it once
+against each deployment, with the same worker count:
+
+    SERVER_MODE=wsgi /start    # or: gunicorn core.wsgi:application -w 3
+    SERVER_MODE=asgi /start    # or: gunicorn core.asgi:application -w 3 \\
+                               #       -k uvicorn_worker.UvicornWorker
+                               #     with ASYNC_READ_VIEWS=True
+
+    python benchmarks/read_latency.py --url http://localhost:8000
+"""
+
+import argparse
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from common import request, run_clients, summarize  # noqa: E402
+
+GROUP_NAME = "read-latency-bench"
+
+
+def login(args):
+    credentials = {"email": args.email, "password": args.password}
+    status, _, body = request(args.url, "POST", "/api/auth/login/", credentials)
+    if status == 401:
+        signup = {**credentials, "name": "Bench"}
+        status, _, body = request(args.url, "POST", "/api/auth/signup/", signup)
+    if status >= 400:
+        sys.exit(f"could not log in the benchmark user: {status} {body}")
+    return body["access"]
+
+
+def seed_group(args, token):
+    _, _, groups = request(args.url, "GET", "/api/groups/", token=token)
+    for group in groups:
+        if group["name"] == GROUP_NAME:
+            return group["id"]
+
+    _, _, group = request(
+        args.url, "POST", "/api/groups/", {"name": GROUP_NAME}, token=token
+    )
+    members_url = f"/api/groups/{group['id']}/members/"
+    for i in range(args.members - 1):
+        member = {"name": f"Member {i}", "email": f"bench-member-{i}@example.com"}
+        request(args.url, "POST", members_url, member, token=token)
+    _, _, members = request(args.url, "GET", members_url, token=token)
+
+    payers = itertools.cycle(members)
+    expenses_url = f"/api/groups/{group['id']}/expenses/"
+    for i in range(args.expenses):
+        expense = {
+            "title": f"Expense {i}",
+            "paid_by": next(payers)["id"],
+            "amount": 10 + i,
+        }
+        status, _, body = request(args.url, "POST", expenses_url, expense, token=token)
+        if status >= 400:
+            sys.exit(f"could not seed expenses: {status} {body}")
+    return group["id"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", default="bench@example.com")
+    parser.add_argument("--password", default="bench-password")
+    parser.add_argument("--members", type=int, default=8)
+    parser.add_argument("--expenses", type=int, default=50)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20)
+    args = parser.parse_args()
+
+    token = login(args)
+    group_id = seed_group(args, token)
+    # re-login: seeding may take longer than the 30s access token lifetime
+    token = login(args)
+
+    endpoints = {
+        "group list": "/api/groups/",
+        "expense list": f"/api/groups/{group_id}/expenses/",
+        "balances": f"/api/groups/{group_id}/balances/",
+        "suggested settlements": f"/api/groups/{group_id}/suggested-settlements/",
+    }
+    paths = itertools.cycle(endpoints.items())
+    samples = {name: [] for name in endpoints}
+
+    def task():
+        name, path = next(paths)
+        status, elapsed, body = request(args.url, "GET", path, token=token)
+        samples[name].append((status, elapsed))
+        return status, elapsed, body
+
+    # access tokens expire after ACCESS_TOKEN_LIFETIME (30s), keep --duration below it
+    threads, results = run_clients(args.clients, args.duration, task)
+    for t in threads:
+        t.join()
+
+    print(f"{args.duration:.0f}s, {args.clients} clients against {args.url}")
+    summarize("all reads", results, args.duration)
+    for name, calls in samples.items():
+        summarize(name, calls, args.duration)
+
+
+if __name__ == "__main__":
+    main()
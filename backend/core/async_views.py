@@ -0,0 +1,69 @@
+"""
+Base class for the natively async read endpoints (expenses.async_views,
+groups.async_views), enabled with ASYNC_READ_VIEWS when served through ASGI.
+
+DRF views are sync only, so an AsyncReadView answers GET itself with the
+async ORM and hands everything else to the DRF view it stands in for
+(`fallback_view`), run in a thread. That covers writes and the GETs it does
+not serve natively (failed authentication or permission checks, pages past
+the first, invalid query params), so error responses stay exactly DRF's.
+"""
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import JSONRenderer
+
+
+def render_json(data, status_code=status.HTTP_200_OK):
+    """Renders `data` the way DRF's JSONRenderer does."""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        status=status_code,
+        content_type="application/json",
+    )
+
+
+class AsyncReadView(View):
+    # the DRF view answering everything the async `get` does not
+    fallback_view = None
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # authentication is token based, like the DRF views it replaces
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method == "GET":
+            user = await self.authenticate(request)
+            if user is not None:
+                request.user = user
+                response = await self.get(request, *args, **kwargs)
+                if response is not None:
+                    return response
+        return await self.fallback(request, *args, **kwargs)
+
+    async def get(self, request, *args, **kwargs):
+        """Returns the response, or None to let the fallback view answer."""
+        return None
+
+    async def authenticate(self, request):
+        """
+        Runs the fallback view's authenticators and returns the user, or None
+        when the request is anonymous or its credentials are invalid.
+        """
+        for authenticator in self.fallback_view.authentication_classes:
+            try:
+                auth = await sync_to_async(authenticator().authenticate)(request)
+            except APIException:
+                return None
+            if auth is not None:
+                return auth[0]
+        return None
+
+    async def fallback(self, request, *args, **kwargs):
+        view = self.fallback_view.as_view()
+        return await sync_to_async(view)(request, *args, **kwargs)
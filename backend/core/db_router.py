@@ -0,0 +1,114 @@
+"""
+Read replica routing (settings.DATABASE_REPLICA, see POSTGRES_REPLICA_* in
+settings).
+
+Reads of safe (GET, HEAD, OPTIONS) requests go to the replica, everything
+else to the primary (`default`): writes, every query of unsafe requests and
+any query outside a request (management commands, shell).
+
+A replica lags behind the primary, so users read their own writes from the
+primary: a successful unsafe request pins its user to the primary for
+settings.DB_REPLICA_STICKY_SECONDS (in the cache, share it between workers
+with REDIS_URL), and the JWT authentication routes the rest of the user's
+requests accordingly (`pin_reads_if_recent_writer`). A request that writes
+reads from the primary from then on, as does anything in a transaction.
+"""
+
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+
+class _Routing:
+    """Where the reads of the current request go, mutated as it learns more."""
+
+    __slots__ = ("use_replica",)
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+
+
+_routing = ContextVar("db_routing", default=None)
+
+
+def primary_pin_key(user_id):
+    return f"db-primary-pin:{user_id}"
+
+
+def pin_reads_if_recent_writer(user_id):
+    """Sends the current request's reads to the primary if the user wrote lately."""
+    routing = _routing.get()
+    if routing is not None and routing.use_replica:
+        if cache.get(primary_pin_key(user_id)):
+            routing.use_replica = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (
+            routing is None
+            or not routing.use_replica
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return settings.DATABASE_REPLICA
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.use_replica = False  # read what this request wrote
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # the replica holds the same rows as the primary
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Sets up the routing of each request, and pins users that wrote."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICA:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _routing.set(_Routing(request.method in SAFE_METHODS))
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self.pin_writer(request, response)
+        return response
+
+    async def __acall__(self, request):
+        token = _routing.set(_Routing(request.method in SAFE_METHODS))
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        await sync_to_async(self.pin_writer)(request, response)
+        return response
+
+    def pin_writer(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400:
+            return
+        # set by DRF once the view authenticated the request
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            cache.set(
+                primary_pin_key(user.pk), True, settings.DB_REPLICA_STICKY_SECONDS
+            )
@@ -0,0 +1,244 @@
+"""
+Prometheus metrics for the API, served at /metrics (core.urls).
+
+Every gunicorn worker keeps its own metrics. docker/django/start sets
+PROMETHEUS_MULTIPROC_DIR, so the workers share them through files there
+and any worker can answer a scrape with the totals.
+"""
+
+import os
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client import multiprocess
+
+# requests, labelled with the url name of the view that answered them
+HTTP_REQUEST_DURATION = Histogram(
+    "splitzy_http_request_duration_seconds",
+    "Time to answer a request.",
+    ["view", "method"],
+)
+HTTP_REQUESTS = Counter(
+    "splitzy_http_requests",
+    "Answered requests.",
+    ["view", "method", "status"],
+)
+DB_QUERIES = Histogram(
+    "splitzy_db_queries_per_request",
+    "Database queries run by one request.",
+    ["view"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_QUERY_DURATION = Histogram(
+    "splitzy_db_query_seconds_per_request",
+    "Time one request spent in database queries.",
+    ["view"],
+)
+
+# settlement solvers (expenses.settlement.run_settlement)
+SETTLEMENT_DURATION = Histogram(
+    "splitzy_settlement_duration_seconds",
+    "Time to compute the settlement transactions of a group.",
+    ["algorithm"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+SETTLEMENT_PARTIES = Histogram(
+    "splitzy_settlement_parties",
+    "Members with a non-zero balance handed to the settlement solver.",
+    ["algorithm"],
+    buckets=(0, 2, 5, 10, 20, 50, 100, 500, 1000, 10000),
+)
+
+# outgoing email
+EMAIL_SEND_DURATION = Histogram(
+    "splitzy_email_send_duration_seconds",
+    "Time to hand an email to the mail server.",
+    ["kind"],
+)
+EMAIL_SEND_FAILURES = Counter(
+    "splitzy_email_send_failures",
+    "Emails the mail server refused or that failed to send.",
+    ["kind"],
+)
+
+# psycopg_pool statistics (ConnectionPool.get_stats()), current levels
+DB_POOL_GAUGES = {
+    stat: Gauge(name, doc, ["alias"], multiprocess_mode="livesum")
+    for stat, name, doc in [
+        ("pool_max", "splitzy_db_pool_max_connections", "Pool size limit."),
+        ("pool_size", "splitzy_db_pool_connections", "Connections open."),
+        ("pool_available", "splitzy_db_pool_idle_connections", "Idle connections."),
+        (
+            "requests_waiting",
+            "splitzy_db_pool_waiting_requests",
+            "Requests waiting for a connection.",
+        ),
+    ]
+}
+# ... and running totals
+DB_POOL_COUNTERS = {
+    stat: Counter(name, doc, ["alias"])
+    for stat, name, doc in [
+        ("requests_num", "splitzy_db_pool_checkouts", "Connections checked out."),
+        (
+            "requests_queued",
+            "splitzy_db_pool_waits",
+            "Checkouts that had to wait for a connection.",
+        ),
+        (
+            "requests_errors",
+            "splitzy_db_pool_timeouts",
+            "Checkouts that timed out waiting for a connection.",
+        ),
+        (
+            "connections_lost",
+            "splitzy_db_pool_lost_connections",
+            "Broken connections dropped by the health check.",
+        ),
+    ]
+}
+DB_POOL_WAIT = Counter(
+    "splitzy_db_pool_wait_seconds",
+    "Time spent waiting for a pooled connection.",
+    ["alias"],
+)
+
+
+class PoolStatsSampler:
+    """
+    Copies the connection pool statistics of this process into the metrics,
+    at most once per `interval` seconds. The pool reports running totals, so
+    the counters are advanced by the change since the previous sample.
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.sampled_at = float("-inf")
+        self.previous = {}
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        if time.monotonic() - self.sampled_at < self.interval:
+            return
+        if not self.lock.acquire(blocking=False):
+            return  # another thread is sampling right now
+        try:
+            self.sampled_at = time.monotonic()
+            for alias in connections:
+                # only the postgresql backend has pools (OPTIONS["pool"])
+                pool = getattr(connections[alias], "pool", None)
+                if pool is not None:
+                    self.record(alias, pool.get_stats())
+        finally:
+            self.lock.release()
+
+    def record(self, alias, stats):
+        # counters the pool never incremented are left out of the stats
+        previous = self.previous.get(alias, {})
+        for stat, gauge in DB_POOL_GAUGES.items():
+            gauge.labels(alias).set(stats.get(stat, 0))
+        for stat, counter in DB_POOL_COUNTERS.items():
+            counter.labels(alias).inc(stats.get(stat, 0) - previous.get(stat, 0))
+        wait_ms = stats.get("requests_wait_ms", 0) - previous.get("requests_wait_ms", 0)
+        DB_POOL_WAIT.labels(alias).inc(wait_ms / 1000)
+        self.previous[alias] = stats
+
+
+sample_pool_stats = PoolStatsSampler()
+
+
+class QueryStats:
+    """
+    Counts the queries run on every database alias, and the time spent in
+    them, while used as a context manager.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self._wrappers = ExitStack()
+
+    def __enter__(self):
+        for connection in connections.all():
+            self._wrappers.enter_context(connection.execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.close()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and database usage of every request and
+    keeps the sampled metrics fresh.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with QueryStats() as queries:
+            response = self.get_response(request)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        # connections are per thread: wrap those of the thread the async ORM
+        # (and sync_to_async code) of this request runs in
+        queries = await sync_to_async(QueryStats().__enter__)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.__exit__)(None, None, None)
+        self.record(request, response, time.perf_counter() - start, queries)
+        return response
+
+    def record(self, request, response, seconds, queries):
+        # url names keep the label set small, unlike raw paths with ids
+        match = request.resolver_match
+        view = match.view_name if match else "unmatched"
+        HTTP_REQUEST_DURATION.labels(view, request.method).observe(seconds)
+        HTTP_REQUESTS.labels(view, request.method, response.status_code).inc()
+        DB_QUERIES.labels(view).observe(queries.count)
+        DB_QUERY_DURATION.labels(view).observe(queries.seconds)
+        sample_pool_stats()
+
+
+def metrics_view(request):
+    sample_pool_stats()
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
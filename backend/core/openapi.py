@@ -0,0 +1,53 @@
+"""
+Serves the OpenAPI schema pre-generated by `manage.py openapi_schema`
+(settings.OPENAPI_SCHEMA_FILE) at api/schema/, without importing drf_yasg.
+
+The file is read once and again only when it changes. Responses carry an
+ETag of its content, so clients revalidate with a 304 instead of
+downloading the schema again.
+"""
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_safe
+
+# (path, mtime, size) of the file read last, its content and its ETag
+_schema = None
+
+
+def load_schema():
+    """(content, etag) of the schema file, or None if it was not generated."""
+    global _schema
+    path = settings.OPENAPI_SCHEMA_FILE
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    schema = _schema
+    if schema is None or schema[0] != key:
+        with open(path, "rb") as f:
+            content = f.read()
+        schema = _schema = (key, content, hashlib.sha256(content).hexdigest())
+    return schema[1:]
+
+
+def schema_etag(request):
+    schema = load_schema()
+    return schema[1] if schema else None
+
+
+@require_safe
+@cache_control(public=True, no_cache=True)
+@condition(etag_func=schema_etag)
+def openapi_schema_view(request):
+    schema = load_schema()
+    if schema is None:
+        raise Http404("No schema, run `manage.py openapi_schema`.")
+    yaml = settings.OPENAPI_SCHEMA_FILE.suffix in (".yaml", ".yml")
+    content_type = "application/yaml" if yaml else "application/json"
+    return HttpResponse(schema[0], content_type=content_type)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from importlib.util import find_spec
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -31,9 +32,19 @@ ALLOWED_HOSTS = [
     "localhost",
     "127.0.0.1",
     ".basnetsumit.com.np",
+    "api",  # compose service name, used by Prometheus to scrape /metrics
 ]
 CLIENT_DOMAIN = os.getenv("CLIENT_DOMAIN")
 
+# Swagger UI at api/swagger/, generating the schema live on every hit
+# (drf_yasg, optional). Production turns it off, so workers never import
+# drf_yasg, and api/schema/ serves the file written at build time by
+# `manage.py openapi_schema`.
+SWAGGER_UI = (
+    os.getenv("SWAGGER_UI", "True") == "True" and find_spec("drf_yasg") is not None
+)
+OPENAPI_SCHEMA_FILE = Path(os.getenv("OPENAPI_SCHEMA_FILE", BASE_DIR / "openapi.json"))
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -45,7 +56,7 @@ INSTALLED_APPS = [
     "rest_framework",
     "rest_framework_simplejwt",
     "rest_framework_simplejwt.token_blacklist",
-    "drf_yasg",
+    *(["drf_yasg"] if SWAGGER_UI else []),
     "corsheaders",
     # custom apps
     "users",
@@ -54,6 +65,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.metrics.MetricsMiddleware",
+    "core.db_router.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -90,15 +103,72 @@ WSGI_APPLICATION = "core.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        # django.db.backends.sqlite3 (NAME: a file path) works for offline runs
+        "ENGINE": os.getenv("POSTGRES_ENGINE", "django.db.backends.postgresql"),
         "NAME": os.getenv("POSTGRES_DB"),
         "USER": os.getenv("POSTGRES_USER"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST", "localhost"),
         "PORT": os.getenv("POSTGRES_PORT", 5432),
+        # reuse connections across requests, checked before each reuse
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# gunicorn workers per container (docker/django/start); every worker holds
+# its own connections, so pools are sized to share DB_MAX_CONNECTIONS
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 3))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", 90))
+# psycopg connection pool instead of persistent connections, recommended
+# with SERVER_MODE=asgi; needs psycopg[pool]
+if os.getenv("DB_POOL", "False") == "True":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # the pool keeps them instead
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(
+                os.getenv(
+                    "DB_POOL_MAX_SIZE", max(2, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)
+                )
+            ),
+            # seconds a request waits for a free connection before failing
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        }
+    }
+
+# Read replica (core.db_router): safe requests read from it, unless their
+# user wrote in the last DB_REPLICA_STICKY_SECONDS. Same credentials as the
+# primary; for an offline run with sqlite3, POSTGRES_REPLICA_DB is a file.
+if os.getenv("POSTGRES_REPLICA_HOST") or os.getenv("POSTGRES_REPLICA_DB"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.getenv("POSTGRES_REPLICA_DB", DATABASES["default"]["NAME"]),
+        "HOST": os.getenv("POSTGRES_REPLICA_HOST", DATABASES["default"]["HOST"]),
+        "PORT": os.getenv("POSTGRES_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        # tests run against the primary's test database only
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+DATABASE_REPLICA = "replica" if "replica" in DATABASES else None
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+
+
+# Cache
+# local memory per worker by default; set REDIS_URL to share it between workers
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -119,6 +189,16 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Async signup/login/password change (users.async_views): Argon2 runs on a
+# bounded thread pool, worth enabling when served through ASGI
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS", "False") == "True"
+# hashes running at once, and hashes allowed to wait before answering 503
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 2))
+PASSWORD_HASHING_MAX_PENDING = int(os.getenv("PASSWORD_HASHING_MAX_PENDING", 32))
+# Async GET handlers for the read-heavy group/expense endpoints
+# (expenses.async_views, groups.async_views), for ASGI deployments
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "False") == "True"
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -153,13 +233,30 @@ AUTH_USER_MODEL = "users.CustomUser"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ["rest_framework.permissions.IsAuthenticated"],
 }
 
+# settlement algorithm used for suggested/proposed transactions (see expenses.settlement)
+SETTLEMENT_SOLVER = os.getenv("SETTLEMENT_SOLVER", "greedy")
+# ?mode=optimal: exact solver limits before falling back to the greedy result
+SETTLEMENT_OPTIMAL_MAX_PARTIES = int(os.getenv("SETTLEMENT_OPTIMAL_MAX_PARTIES", 20))
+SETTLEMENT_OPTIMAL_TIME_BUDGET = float(os.getenv("SETTLEMENT_OPTIMAL_TIME_BUDGET", 0.5))
+# seconds a group's suggested settlements stay cached for one ledger version
+SETTLEMENTS_CACHE_TIMEOUT = int(os.getenv("SETTLEMENTS_CACHE_TIMEOUT", 60 * 60))
+# rows fetched per query round trip by the ledger export (expenses.export)
+LEDGER_EXPORT_CHUNK_SIZE = int(os.getenv("LEDGER_EXPORT_CHUNK_SIZE", 2000))
+# largest file, in rows, accepted by the bulk expense import (expenses.importer)
+EXPENSE_IMPORT_MAX_ROWS = int(os.getenv("EXPENSE_IMPORT_MAX_ROWS", 10000))
+# most expenses accepted in one batch POST to expense-list-create
+EXPENSE_BATCH_MAX_SIZE = int(os.getenv("EXPENSE_BATCH_MAX_SIZE", 100))
+
 from datetime import timedelta
 
+# seconds an authenticated user stays cached (users.authentication)
+AUTH_USER_CACHE_TIMEOUT = int(os.getenv("AUTH_USER_CACHE_TIMEOUT", 30))
+
 # SIMPLE JWT CONF
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ["Bearer"],
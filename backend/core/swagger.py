@@ -4,15 +4,17 @@ from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
 
+api_info = openapi.Info(
+    title="API docs",
+    default_version="v1",
+    description="API Test Documentation",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@api.local"),
+    license=openapi.License(name="BSD License"),
+)
+
 schema_view = get_schema_view(
-    openapi.Info(
-        title="API docs",
-        default_version="v1",
-        description="API Test Documentation",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@api.local"),
-        license=openapi.License(name="BSD License"),
-    ),
+    api_info,
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
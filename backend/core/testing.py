@@ -0,0 +1,82 @@
+"""Helpers shared by the apps' tests."""
+
+from django.db import connection, transaction
+
+from groups.models import Groups, Membership
+from users.models import CustomUser
+
+
+class QueryPlanMixin:
+    """
+    assertUsesIndex EXPLAINs a queryset and checks that the plan goes
+    through the named index (or unique constraint).
+
+    Tiny test tables are always scanned sequentially by PostgreSQL, so
+    sequential scans are turned off for the EXPLAIN (and only for it). That
+    leaves the planner free to pick any usable index: the name check is what
+    shows it picks this one.
+    """
+
+    def index_names(self, model, name):
+        """`name` and, on SQLite, the sqlite_autoindex_* backing that constraint."""
+        table = model._meta.db_table
+        names = {name}
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                constraints = connection.introspection.get_constraints(cursor, table)
+                columns = constraints[name]["columns"]
+                cursor.execute(f"PRAGMA index_list({table})")
+                for index in [row[1] for row in cursor.fetchall()]:
+                    cursor.execute(f"PRAGMA index_info({index})")
+                    if [row[2] for row in cursor.fetchall()] == columns:
+                        names.add(index)
+        return names
+
+    def foreign_key_index(self, model, field):
+        """Name of the index Django creates for the foreign key `field`."""
+        column = model._meta.get_field(field).column
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, model._meta.db_table
+            )
+        return next(
+            name
+            for name, c in constraints.items()
+            if c["index"] and not c["unique"] and c["columns"] == [column]
+        )
+
+    def assertUsesIndex(self, qs, index):
+        if connection.vendor == "postgresql":
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                plan = qs.explain()
+        else:
+            plan = qs.explain()
+        names = self.index_names(qs.model, index)
+        self.assertTrue(any(name in plan for name in names), plan)
+
+
+class GroupFixtureMixin:
+    """
+    setUp creates `self.user`, who owns the groups make_group creates. A
+    group's first member is the user's own verified membership, the others
+    are unverified m<i>@example.com members.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create_user(
+            username="owner@example.com", email="owner@example.com", name="Owner"
+        )
+
+    def make_group(self, size=3, name="household"):
+        group = Groups.objects.create(name=name, admin=self.user)
+        members = [
+            Membership.objects.create(
+                name="Owner", email=self.user.email, group_id=group, user_id=self.user
+            )
+        ] + [
+            Membership.objects.create(email=f"m{i}@example.com", group_id=group)
+            for i in range(size - 1)
+        ]
+        return group, members
@@ -0,0 +1,190 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework_simplejwt.tokens import AccessToken
+
+from expenses.settlement import run_settlement
+from groups.models import Groups
+from users.models import CustomUser
+
+from .db_router import ReplicaRouter
+from .metrics import PoolStatsSampler
+from .testing import GroupFixtureMixin
+
+
+class PoolMetricsTests(SimpleTestCase):
+    def value(self, name, alias="pool-test"):
+        return REGISTRY.get_sample_value(name, {"alias": alias})
+
+    def test_counters_advance_by_the_change_between_samples(self):
+        sampler = PoolStatsSampler()
+        sampler.record(
+            "pool-test", {"pool_size": 3, "requests_num": 10, "requests_wait_ms": 500}
+        )
+        sampler.record(
+            "pool-test",
+            {"pool_size": 2, "requests_num": 15, "requests_wait_ms": 1500},
+        )
+        self.assertEqual(self.value("splitzy_db_pool_connections"), 2)
+        self.assertEqual(self.value("splitzy_db_pool_checkouts_total"), 15)
+        self.assertEqual(self.value("splitzy_db_pool_wait_seconds_total"), 1.5)
+        self.assertEqual(self.value("splitzy_db_pool_timeouts_total"), 0)
+
+    def test_metrics_are_served(self):
+        PoolStatsSampler().record("pool-test", {"pool_max": 30})
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            b'splitzy_db_pool_max_connections{alias="pool-test"} 30.0',
+            response.content,
+        )
+
+
+class RequestMetricsTests(TestCase):
+    def value(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_recorded_per_view(self):
+        view, url = "user_profile", reverse("user_profile")
+        user = CustomUser.objects.create_user(
+            username="user@example.com", email="user@example.com", name="User"
+        )
+        token = AccessToken.for_user(user)
+        requests = self.value(
+            "splitzy_http_requests_total", view=view, method="GET", status="200"
+        )
+        queries = self.value("splitzy_db_queries_per_request_sum", view=view)
+        response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.value(
+                "splitzy_http_requests_total", view=view, method="GET", status="200"
+            ),
+            requests + 1,
+        )
+        # loading the user on a cold authentication cache
+        self.assertEqual(
+            self.value("splitzy_db_queries_per_request_sum", view=view), queries + 1
+        )
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(
+            self.value(
+                "splitzy_http_requests_total", view=view, method="GET", status="401"
+            ),
+            1,
+        )
+
+    def test_settlements_are_timed_with_their_input_size(self):
+        before = self.value("splitzy_settlement_parties_sum", algorithm="greedy")
+        run_settlement({"a": 500, "b": -200, "c": -300, "d": 0}, "greedy")
+        self.assertEqual(
+            self.value("splitzy_settlement_parties_sum", algorithm="greedy"),
+            before + 3,
+        )
+        self.assertGreater(
+            self.value("splitzy_settlement_duration_seconds_count", algorithm="greedy"),
+            0,
+        )
+
+
+class OpenApiSchemaTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.schema_file = Path(directory.name) / "openapi.json"
+        settings = override_settings(OPENAPI_SCHEMA_FILE=self.schema_file)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_missing_schema_is_not_found(self):
+        self.assertEqual(self.client.get(reverse("openapi-schema")).status_code, 404)
+
+    def test_generated_schema_is_served_with_an_etag(self):
+        call_command("openapi_schema", stdout=StringIO())
+        schema = json.loads(self.schema_file.read_bytes())
+        self.assertIn("/groups/{id}/expenses/", schema["paths"])
+
+        response = self.client.get(reverse("openapi-schema"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), schema)
+
+        cached = self.client.get(
+            reverse("openapi-schema"), headers={"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(cached.status_code, 304)
+
+        # a new schema is picked up without a restart, under a new ETag
+        self.schema_file.write_text(json.dumps({**schema, "paths": {}}))
+        changed = self.client.get(
+            reverse("openapi-schema"), headers={"If-None-Match": response["ETag"]}
+        )
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(json.loads(changed.content)["paths"], {})
+
+
+@override_settings(
+    DATABASE_REPLICA="replica", DATABASE_ROUTERS=["core.db_router.ReplicaRouter"]
+)
+class ReplicaRoutingTests(GroupFixtureMixin, TransactionTestCase):
+    # TestCase would run every query in a transaction, that is on the primary
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.group, (self.owner, _) = self.make_group(2, name="Trip")
+        self.headers = {"Authorization": f"Bearer {AccessToken.for_user(self.user)}"}
+
+        # record where reads are routed, but run them all on the one test database
+        self.reads = []
+        route = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            self.reads.append(route(router, model, **hints))
+            return DEFAULT_DB_ALIAS
+
+        patcher = mock.patch.object(
+            ReplicaRouter, "db_for_read", autospec=True, side_effect=record
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_balances(self):
+        self.reads.clear()
+        url = reverse("expenses:balances", kwargs={"pk": self.group.id})
+        self.assertEqual(self.client.get(url, headers=self.headers).status_code, 200)
+        return set(self.reads)
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.get_balances(), {"replica"})
+
+    def test_writers_read_from_the_primary_for_a_while(self):
+        url = reverse("expenses:expense-list-create", kwargs={"pk": self.group.id})
+        data = {"title": "Dinner", "paid_by": str(self.owner.id), "amount": 30}
+        self.reads.clear()
+        response = self.client.post(url, data, "application/json", headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(set(self.reads), {"default"})
+
+        self.assertEqual(self.get_balances(), {"default"})
+        cache.clear()  # the stickiness window ran out
+        self.assertEqual(self.get_balances(), {"replica"})
+
+    def test_reads_outside_requests_and_transactions_use_the_primary(self):
+        list(Groups.objects.all())
+        with transaction.atomic():
+            list(Groups.objects.all())
+        self.assertEqual(self.reads, ["default", "default"])
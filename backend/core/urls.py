@@ -15,13 +15,22 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+from .openapi import openapi_schema_view
+
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path("api/swagger/", include("core.swagger")),
+    path("api/schema/", openapi_schema_view, name="openapi-schema"),
     path("api/", include("users.urls")),
     path("api/groups/", include("groups.urls")),
     path("api/", include("expenses.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
+
+if settings.SWAGGER_UI:
+    # imports drf_yasg, which production workers go without
+    urlpatterns.append(path("api/swagger/", include("core.swagger")))
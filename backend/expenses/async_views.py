@@ -0,0 +1,113 @@
+"""
+Async versions of the read-heavy expense endpoints, served when
+ASYNC_READ_VIEWS is on. They answer GET with the async ORM and return the
+same payloads as expenses.views; everything else goes to the DRF view.
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.request import Request
+
+from core.async_views import AsyncReadView, render_json
+from groups.permissions import aget_group_context
+
+from . import ledger
+from .models import Expenses, GroupBalances
+from .serializers import (
+    ExpensesDetailSerializer,
+    GroupBalancesSerializer,
+    SettlementSerializer,
+)
+from .settlement import SETTLEMENT_SOLVERS, run_settlement
+from .views import (
+    ExpensesView,
+    GroupBalanceView,
+    SuggestedSettlementsView,
+    with_expense_details,
+)
+
+
+class GroupMemberReadView(AsyncReadView):
+    async def get_group(self, request):
+        """
+        Returns the url's group when the user is a member of it, otherwise
+        None so the DRF view answers with its 403/404.
+        """
+        context = await aget_group_context(request, self)
+        if context.membership_id is None:
+            return None
+        return context.group
+
+
+class AsyncExpensesView(GroupMemberReadView):
+    fallback_view = ExpensesView
+
+    async def get(self, request, *args, **kwargs):
+        paginator = self.fallback_view.pagination_class()
+        if paginator.cursor_query_param in request.GET:
+            # later pages are rare next to the first one, DRF builds them
+            return None
+        group = await self.get_group(request)
+        if group is None:
+            return None
+        qs = paginator.first_page_queryset(
+            with_expense_details(Expenses.objects.filter(group_id=group.id)),
+            Request(request),
+            self,
+        )
+        page = paginator.first_page([expense async for expense in qs])
+        data = ExpensesDetailSerializer(page, many=True).data
+        return render_json(paginator.get_paginated_response(data).data)
+
+
+class AsyncGroupBalanceView(GroupMemberReadView):
+    fallback_view = GroupBalanceView
+
+    async def get(self, request, *args, **kwargs):
+        group = await self.get_group(request)
+        if group is None:
+            return None
+        balances = [b async for b in GroupBalances.objects.filter(group_id=group.id)]
+        return render_json(GroupBalancesSerializer(balances, many=True).data)
+
+
+class AsyncSuggestedSettlementsView(GroupMemberReadView):
+    fallback_view = SuggestedSettlementsView
+
+    async def get(self, request, *args, **kwargs):
+        mode = request.GET.get("mode", settings.SETTLEMENT_SOLVER)
+        if mode not in SETTLEMENT_SOLVERS:
+            return None
+        group = await self.get_group(request)
+        if group is None:
+            return None
+        cache_key = ledger.settlements_cache_key(group.id, group.ledger_version, mode)
+        cached = await cache.aget(cache_key)
+        elapsed_ms = None  # only reported when solved by this request
+        if cached is None:
+            balances = {
+                member_id: balance
+                async for member_id, balance in GroupBalances.objects.filter(
+                    group_id=group.id
+                ).values_list("member_id", "balance")
+            }
+            # the exact solver may run for its whole time budget, keep it off the loop
+            result = await sync_to_async(run_settlement, thread_sensitive=False)(
+                balances, mode
+            )
+            elapsed_ms = result.elapsed_ms
+            cached = {
+                "algorithm": result.algorithm,
+                "settlements": SettlementSerializer(
+                    result.transactions, many=True
+                ).data,
+            }
+            await cache.aset(cache_key, cached, settings.SETTLEMENTS_CACHE_TIMEOUT)
+        response = render_json(cached["settlements"])
+        response["X-Settlement-Algorithm"] = cached["algorithm"]
+        if elapsed_ms is None:
+            response["X-Settlement-Cache"] = "hit"
+        else:
+            response["X-Settlement-Time-Ms"] = f"{elapsed_ms:.3f}"
+        return response
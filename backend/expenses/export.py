@@ -0,0 +1,157 @@
+"""
+Group ledger export (GroupLedgerExportView), streamed as CSV or JSON lines.
+
+Rows come straight from `values()` querysets read with `iterator()`, so no
+model or serializer instances are built and memory stays flat however long
+the ledger is. Every expense gives one row per participant (a single row,
+without participant, for an equal split), followed by the recorded payments,
+oldest first. Amounts are exact decimal strings in major units. In the CSV,
+text starting like a spreadsheet formula (=, +, -, @) is prefixed with a
+quote; JSON lines carry it as entered.
+"""
+
+import csv
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import Expenses, TransactionRecords
+from .money import to_major
+
+FIELDS = [
+    "record",
+    "id",
+    "created_at",
+    "title",
+    "description",
+    "amount",
+    "paid_by",
+    "paid_by_name",
+    "participant",
+    "participant_name",
+    "participant_paid",
+    "debtor",
+    "debtor_name",
+    "creditor",
+    "creditor_name",
+]
+MONEY_FIELDS = ("amount", "participant_paid")
+# user-entered text, which spreadsheets would run as a formula in a CSV cell
+TEXT_FIELDS = (
+    "title",
+    "description",
+    "paid_by_name",
+    "participant_name",
+    "debtor_name",
+    "creditor_name",
+)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def ledger_rows(group_id):
+    chunk_size = settings.LEDGER_EXPORT_CHUNK_SIZE
+    expenses = (
+        Expenses.objects.filter(group_id=group_id)
+        .order_by("created_at", "id", "expensesparticipants__member_id")
+        .values(
+            "id",
+            "created_at",
+            "title",
+            "description",
+            "amount",
+            "paid_by",
+            paid_by_name=F("paid_by__name"),
+            participant=F("expensesparticipants__member_id"),
+            participant_name=F("expensesparticipants__member_id__name"),
+            participant_paid=F("expensesparticipants__paid_amt"),
+        )
+    )
+    for row in expenses.iterator(chunk_size=chunk_size):
+        yield {"record": "expense", **row}
+
+    payments = (
+        TransactionRecords.objects.filter(group_id=group_id, type="A")
+        .order_by("created_at", "id")
+        .values(
+            "id",
+            "created_at",
+            "debtor",
+            "creditor",
+            amount=F("payment"),
+            debtor_name=F("debtor__name"),
+            creditor_name=F("creditor__name"),
+        )
+    )
+    for row in payments.iterator(chunk_size=chunk_size):
+        yield {"record": "payment", **row}
+
+
+def _exported(row):
+    for field in MONEY_FIELDS:
+        if row.get(field) is not None:
+            row[field] = str(to_major(row[field]))
+    row["created_at"] = row["created_at"].isoformat()
+    return row
+
+
+class _Echo:
+    """File-like object handing back what csv.writer writes."""
+
+    def write(self, value):
+        return value
+
+
+def _spreadsheet_safe(row):
+    for field in TEXT_FIELDS:
+        value = row.get(field)
+        if value and value.startswith(FORMULA_PREFIXES):
+            row[field] = "'" + value
+    return row
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        row = _spreadsheet_safe(_exported(row))
+        yield writer.writerow([row.get(f) for f in FIELDS])  # None: empty cell
+
+
+def jsonl_lines(rows):
+    encoder = DjangoJSONEncoder(separators=(",", ":"))
+    for row in rows:
+        row = _exported(row)
+        yield encoder.encode({f: row[f] for f in FIELDS if row.get(f) is not None})
+        yield "\n"
+
+
+def batched(lines, size=64 * 1024):
+    """Joins lines into chunks of about `size` characters, one write each."""
+    chunk, length = [], 0
+    for line in lines:
+        chunk.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(chunk)
+            chunk, length = [], 0
+    if chunk:
+        yield "".join(chunk)
+
+
+async def iterate_in_thread(iterator):
+    """
+    Async iterator over a sync one, for ASGI: StreamingHttpResponse would read
+    a sync iterator whole before sending it. Each step runs in the request's
+    sync thread, which holds the database cursor.
+    """
+    while (chunk := await sync_to_async(next)(iterator, None)) is not None:
+        yield chunk
+
+
+EXPORT_FORMATS = {
+    # format: (lines, content type)
+    "csv": (csv_lines, "text/csv"),
+    "jsonl": (jsonl_lines, "application/x-ndjson"),
+}
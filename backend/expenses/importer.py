@@ -0,0 +1,272 @@
+"""
+Bulk expense import (ExpenseImportView) from an uploaded CSV or JSON lines
+file, for groups moving over from spreadsheets.
+
+CSV files have a header row and the columns
+
+    title, amount, paid_by, description, participant, participant_paid
+
+with one row per participant, the rows of an expense following each other
+under the same title (as in the ledger export), or a single row without
+participant for an expense split equally between all members. JSON lines
+files have one expense per line, shaped like a POST to expense-list-create:
+
+    {"title": "Rent", "paid_by": "...", "participants": [
+        {"member_id": "...", "paid_amt": 600}, ...]}
+
+Members are given by membership id or email. The upload is read line by
+line and every expense is validated, with the members resolved in a single
+query, before anything is written. Then all of them are posted at once, in
+one transaction with bulk inserts (ledger.post_expenses), or none of them if
+any row is invalid.
+"""
+
+import codecs
+import csv
+import json
+import time
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework import serializers
+
+from groups.models import Membership
+
+from . import ledger
+from .models import Expenses, ExpensesParticipants
+from .money import expense_balances
+from .serializers import MoneyField
+
+TITLE_MAX_LENGTH = Expenses._meta.get_field("title").max_length
+
+
+class ImportFileError(Exception):
+    """The upload as a whole can't be read (format, encoding, size)."""
+
+
+def read_lines(upload):
+    try:
+        yield from codecs.iterdecode(upload, "utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFileError("The file is not UTF-8 encoded.")
+
+
+def csv_expenses(lines):
+    reader = csv.DictReader(lines)
+    missing = {"title", "paid_by"} - set(reader.fieldnames or [])
+    if missing:
+        raise ImportFileError(f"Missing CSV columns: {', '.join(sorted(missing))}.")
+    expense = None
+    for row in reader:
+        title = (row.get("title") or "").strip()
+        if expense is None or title != expense["title"]:
+            if expense is not None:
+                yield expense
+            expense = {
+                "line": reader.line_num,
+                "rows": 0,
+                "title": title,
+                "description": row.get("description") or "",
+                "amount": row.get("amount") or None,
+                "paid_by": row.get("paid_by"),
+                "participants": [],
+                "errors": [],
+            }
+        expense["rows"] += 1
+        if row.get("participant"):
+            expense["participants"].append(
+                {
+                    "member_id": row["participant"],
+                    "paid_amt": row.get("participant_paid") or 0,
+                }
+            )
+    if expense is not None:
+        yield expense
+
+
+def jsonl_expenses(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        expense = {"line": number, "rows": 1, "errors": []}
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            expense["errors"].append("Not a JSON object.")
+            data = {}
+        participants = data.get("participants") or []
+        if not isinstance(participants, list) or not all(
+            isinstance(p, dict) for p in participants
+        ):
+            expense["errors"].append("participants: Must be a list of objects.")
+            participants = []
+        yield {
+            **expense,
+            "title": str(data.get("title") or "").strip(),
+            "description": str(data.get("description") or ""),
+            "amount": data.get("amount"),
+            "paid_by": data.get("paid_by"),
+            "participants": participants,
+        }
+
+
+IMPORT_FORMATS = {
+    ".csv": csv_expenses,
+    ".jsonl": jsonl_expenses,
+    ".ndjson": jsonl_expenses,
+}
+
+
+def parse(upload):
+    """Reads the upload into a list of expenses, each with its `errors`."""
+    name = (upload.name or "").lower()
+    for extension, expenses in IMPORT_FORMATS.items():
+        if name.endswith(extension):
+            break
+    else:
+        raise ImportFileError(
+            f"Unsupported file type, expected one of: {', '.join(IMPORT_FORMATS)}."
+        )
+    parsed, rows = [], 0
+    for expense in expenses(read_lines(upload)):
+        rows += expense["rows"]
+        if rows > settings.EXPENSE_IMPORT_MAX_ROWS:
+            raise ImportFileError(
+                f"More than {settings.EXPENSE_IMPORT_MAX_ROWS} rows, split the file."
+            )
+        parsed.append(expense)
+    return parsed, rows
+
+
+def money(value, errors, field):
+    try:
+        return MoneyField().run_validation(value)
+    except serializers.ValidationError as e:
+        errors += [f"{field}: {message}" for message in e.detail]
+
+
+def validate(group, expenses):
+    """
+    Resolves the members and amounts of every expense in place and adds what
+    is wrong with it to its `errors`. Returns whether all of them are valid.
+    """
+    members = {}
+    for member_id, email in Membership.objects.filter(group_id=group).values_list(
+        "id", "email"
+    ):
+        members[str(member_id)] = members[email.lower()] = member_id
+    existing_titles = set(
+        Expenses.objects.filter(
+            group_id=group, title__in={e["title"] for e in expenses}
+        ).values_list("title", flat=True)
+    )
+
+    def member(reference):
+        return members.get(str(reference or "").strip().lower())
+
+    titles = set()
+    for expense in expenses:
+        errors = expense["errors"]
+        title = expense["title"]
+        if not title:
+            errors.append("title: This field is required.")
+        elif len(title) > TITLE_MAX_LENGTH:
+            errors.append(f"title: Longer than {TITLE_MAX_LENGTH} characters.")
+        elif title in existing_titles or title in titles:
+            errors.append("Expense with given title already exists in the group")
+        titles.add(title)
+
+        expense["paid_by"] = paid_by = member(expense["paid_by"])
+        if paid_by is None:
+            errors.append("paid_by: Not a member of this group.")
+
+        participants = {}
+        for participant in expense["participants"]:
+            member_id = member(participant.get("member_id"))
+            paid = money(participant.get("paid_amt", 0), errors, "paid_amt")
+            if member_id is None:
+                errors.append(
+                    f"participants: {participant.get('member_id')} is not a "
+                    "member of this group."
+                )
+            elif member_id in participants:
+                errors.append(f"participants: {member_id} is listed twice.")
+            elif paid is not None:
+                participants[member_id] = paid
+
+        if expense["participants"]:
+            # as in ExpensesSerializer.create, participants pay the amount
+            amount = sum(participants.values())
+        elif expense["amount"] in (None, ""):
+            amount = None
+            errors.append("amount: Required for an expense without participants.")
+        else:
+            amount = money(expense["amount"], errors, "amount")
+            if amount is not None and amount <= 0:
+                errors.append("Amount must be greater than zero.")
+
+        if not errors:
+            expense["amount"] = amount
+            expense["participants"] = participants
+            expense["balances"] = expense_balances(
+                amount, paid_by, set(members.values()), participants
+            )
+    return not any(e["errors"] for e in expenses)
+
+
+@transaction.atomic
+def post(group, user, expenses):
+    instances = Expenses.objects.bulk_create(
+        [
+            Expenses(
+                group_id=group,
+                paid_by_id=e["paid_by"],
+                title=e["title"],
+                description=e["description"],
+                amount=e["amount"],
+                added_by=user,
+            )
+            for e in expenses
+        ]
+    )
+    ExpensesParticipants.objects.bulk_create(
+        [
+            ExpensesParticipants(
+                expense_id=instance, member_id_id=member_id, paid_amt=paid
+            )
+            for instance, e in zip(instances, expenses)
+            for member_id, paid in e["participants"].items()
+        ]
+    )
+    ledger.post_expenses(
+        group.id,
+        [(instance, e["balances"]) for instance, e in zip(instances, expenses)],
+    )
+
+
+def import_expenses(group, user, upload):
+    """
+    Imports the expenses of `upload` into `group`. Returns the report sent to
+    the client: counts and speed, and the errors of each invalid expense.
+    """
+    start = time.perf_counter()
+    expenses, rows = parse(upload)
+    valid = validate(group, expenses)
+    if valid:
+        post(group, user, expenses)
+    seconds = time.perf_counter() - start
+    report = {
+        "imported": len(expenses) if valid else 0,
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(rows / seconds) if seconds else rows,
+    }
+    if not valid:
+        report["errors"] = [
+            {"line": e["line"], "title": e["title"], "errors": e["errors"]}
+            for e in expenses
+            if e["errors"]
+        ]
+    return report
@@ -0,0 +1,225 @@
+"""
+Ledger posting service.
+
+Every write to the balance tables goes through here so that an expense (or a
+payment) is turned into ExpenseBalances, proposed TransactionRecords and
+GroupBalances rows in memory first and then written with a fixed number of
+queries, whatever the size of the group.
+"""
+
+import uuid
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from groups.models import Groups, Membership
+
+from .models import (
+    ExpensesParticipants,
+    ExpenseBalances,
+    GroupBalances,
+    TransactionRecords,
+)
+from .money import expense_balances
+from .settlement import suggest_settlements
+
+
+def compute_expense_balances(expense):
+    """
+    Returns {member_id: balance} in minor units for an expense, see
+    money.expense_balances for how it is split.
+    """
+    return compute_expenses_balances([expense])[0][1]
+
+
+def compute_expenses_balances(expenses):
+    """
+    compute_expense_balances for expenses of one group, as (expense, balances)
+    postings, with one query for all their participants and at most one for
+    the group's members.
+    """
+    participants = {}
+    for expense_id, member_id, paid in ExpensesParticipants.objects.filter(
+        expense_id__in=[expense.id for expense in expenses]
+    ).values_list("expense_id", "member_id", "paid_amt"):
+        participants.setdefault(expense_id, {})[member_id] = paid
+    members = []
+    if any(expense.id not in participants for expense in expenses):
+        # split equally and all
+        members = list(
+            Membership.objects.filter(group_id=expenses[0].group_id_id).values_list(
+                "id", flat=True
+            )
+        )
+    return [
+        (
+            expense,
+            expense_balances(
+                expense.amount,
+                expense.paid_by_id,
+                members,
+                participants.get(expense.id, {}),
+            ),
+        )
+        for expense in expenses
+    ]
+
+
+def get_expense_balances(expense):
+    return dict(
+        ExpenseBalances.objects.filter(expense_id=expense.id).values_list(
+            "member_id", "balance"
+        )
+    )
+
+
+# rows per upsert statement: 4 parameters each stays under SQLite's historical
+# limit of 999 bound parameters (and far under PostgreSQL's 65535)
+UPSERT_BATCH_SIZE = 200
+
+
+@transaction.atomic
+def apply_group_balance_deltas(group_id, deltas):
+    """
+    Adds {member_id: delta} onto the group's running balances with
+    INSERT ... ON CONFLICT DO UPDATE statements of UPSERT_BATCH_SIZE rows, so
+    concurrent writers never overwrite each other's deltas, and bumps the
+    group's ledger version.
+    """
+    if not deltas:
+        return
+    meta = GroupBalances._meta
+    qn = connection.ops.quote_name
+    id_field = meta.get_field("id")
+    group_field = meta.get_field("group_id")
+    member_field = meta.get_field("member_id")
+    table, balance = qn(meta.db_table), qn(meta.get_field("balance").column)
+
+    # rows are written in a fixed order so concurrent upserts lock them in the same order
+    members = sorted(deltas, key=str)
+    for start in range(0, len(members), UPSERT_BATCH_SIZE):
+        batch = members[start : start + UPSERT_BATCH_SIZE]
+        params = []
+        for m in batch:
+            params += [
+                id_field.get_db_prep_value(uuid.uuid4(), connection),
+                group_field.get_db_prep_value(group_id, connection),
+                member_field.get_db_prep_value(m, connection),
+                deltas[m],
+            ]
+        values = ", ".join(["(%s, %s, %s, %s)"] * len(batch))
+        sql = (
+            f"INSERT INTO {table} ({qn(id_field.column)}, {qn(group_field.column)}, "
+            f"{qn(member_field.column)}, {balance}) VALUES {values} "
+            f"ON CONFLICT ({qn(group_field.column)}, {qn(member_field.column)}) "
+            f"DO UPDATE SET {balance} = {table}.{balance} + EXCLUDED.{balance}"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+    bump_ledger_version(group_id)
+
+
+def bump_ledger_version(group_id):
+    Groups.objects.filter(id=group_id).update(ledger_version=F("ledger_version") + 1)
+
+
+def settlements_cache_key(group_id, version, mode):
+    return f"settlements:{group_id}:{version}:{mode}"
+
+
+def proposed_transactions(expense, balances):
+    return [
+        TransactionRecords(
+            expense_id=expense,
+            debtor_id=t["debtor"],
+            creditor_id=t["creditor"],
+            payment=t["payment"],
+        )
+        for t in suggest_settlements(balances)
+    ]
+
+
+def record_proposed_transactions(expense, balances):
+    TransactionRecords.objects.bulk_create(proposed_transactions(expense, balances))
+
+
+@transaction.atomic
+def post_expense(expense):
+    """
+    Posts a newly created expense to the ledger and returns its balances.
+    """
+    balances = compute_expense_balances(expense)
+    post_expenses(expense.group_id_id, [(expense, balances)])
+    return balances
+
+
+@transaction.atomic
+def post_expenses(group_id, postings):
+    """
+    Posts new expenses of one group, given as (expense, {member_id: balance})
+    postings: one bulk insert for all their balances, one for all their proposed
+    transactions and a single group balance update with the merged deltas.
+    """
+    ExpenseBalances.objects.bulk_create(
+        [
+            ExpenseBalances(expense_id=expense, member_id_id=m, balance=bal)
+            for expense, balances in postings
+            for m, bal in balances.items()
+        ]
+    )
+    TransactionRecords.objects.bulk_create(
+        [
+            record
+            for expense, balances in postings
+            for record in proposed_transactions(expense, balances)
+        ]
+    )
+    deltas = {}
+    for _, balances in postings:
+        for m, bal in balances.items():
+            deltas[m] = deltas.get(m, 0) + bal
+    apply_group_balance_deltas(group_id, deltas)
+
+
+@transaction.atomic
+def repost_expense(expense):
+    """
+    Re-posts an edited expense: updates its balances in place, replaces its
+    proposed transactions and applies the net difference to the group
+    balances. Takes the same number of queries whatever the size of the
+    expense.
+    """
+    new_balances = compute_expense_balances(expense)
+
+    # delete old transactions saved.
+    TransactionRecords.objects.filter(expense_id=expense.id).delete()
+    record_proposed_transactions(expense, new_balances)
+
+    # only the members that left, joined or whose balance moved are written
+    rows = {
+        row.member_id_id: row
+        for row in ExpenseBalances.objects.filter(expense_id=expense.id)
+    }
+    old_balances = {m: row.balance for m, row in rows.items()}
+    removed = rows.keys() - new_balances.keys()
+    if removed:
+        ExpenseBalances.objects.filter(
+            expense_id=expense.id, member_id__in=removed
+        ).delete()
+    new, changed = [], []
+    for m, bal in new_balances.items():
+        row = rows.get(m)
+        if row is None:
+            new.append(ExpenseBalances(expense_id=expense, member_id_id=m, balance=bal))
+        elif row.balance != bal:
+            row.balance = bal
+            changed.append(row)
+    ExpenseBalances.objects.bulk_create(new)
+    ExpenseBalances.objects.bulk_update(changed, ["balance"])
+
+    # reverse the old balances and add the new ones in a single pass
+    deltas = {m: -bal for m, bal in old_balances.items()}
+    for m, bal in new_balances.items():
+        deltas[m] = deltas.get(m, 0) + bal
+    apply_group_balance_deltas(expense.group_id_id, deltas)
+    return new_balances
@@ -0,0 +1,289 @@
+"""
+Synthetic load test of the group ledger endpoints.
+
+Seeds --groups groups of --members members with --expenses expenses and
+--payments recorded payments each, through the real API routes, then keeps
+--clients threads calling a weighted mix of
+
+    expenses        GET  expense-list-create
+    add-expense     POST expense-list-create
+    balances        GET  balances
+    settlements     GET  suggested-settlements
+    record-payment  POST record-payment
+
+for --duration seconds and reports throughput, latency percentiles and
+queries per request for each. Requests go through Django's test client, in
+process, so no server or network is needed. Everything runs in a throwaway
+test database (as `manage.py test` does), on SQLite or a local Postgres:
+
+    POSTGRES_ENGINE=django.db.backends.sqlite3 python manage.py loadtest
+    python manage.py loadtest --groups 20 --members 12 --expenses 200 \\
+        --clients 8 --duration 30
+"""
+
+import random
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.metrics import QueryStats
+from groups.models import Membership
+from users.models import CustomUser
+
+DEFAULT_MIX = "expenses=4,add-expense=1,balances=4,settlements=4,record-payment=1"
+
+
+def percentile(samples, pct):
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class ApiClient:
+    """A test client acting as one group owner, with a fresh access token."""
+
+    # access tokens live 30s (SIMPLE_JWT), renew them well before
+    TOKEN_MAX_AGE = 20
+
+    def __init__(self, user):
+        self.user = user
+        # server errors are reported as 500s like a real server would
+        self.client = Client(raise_request_exception=False, HTTP_HOST="localhost")
+        self.token_issued_at = float("-inf")
+
+    def request(self, method, url, data=None):
+        if time.monotonic() - self.token_issued_at > self.TOKEN_MAX_AGE:
+            self.token = str(AccessToken.for_user(self.user))
+            self.token_issued_at = time.monotonic()
+        headers = {"Authorization": f"Bearer {self.token}"}
+        if method == "GET":
+            return self.client.get(url, headers=headers)
+        return self.client.post(
+            url, data, content_type="application/json", headers=headers
+        )
+
+
+class Workload:
+    def __init__(self, seed):
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.groups = []  # (owner, group id, [member ids])
+        self.titles = 0
+
+    def next_title(self):
+        with self.lock:
+            self.titles += 1
+            return f"Load test expense {self.titles}"
+
+    def expense(self, members):
+        with self.lock:
+            paid_by = self.random.choice(members)
+            amount = self.random.randint(100, 50000) / 100
+        return {"title": self.next_title(), "paid_by": paid_by, "amount": amount}
+
+    def payment(self, members):
+        with self.lock:
+            debtor, creditor = self.random.sample(members, 2)
+            amount = self.random.randint(100, 5000) / 100
+        return {"debtor": debtor, "creditor": creditor, "payment": amount}
+
+    # name -> (method, url name, payload builder)
+    def operations(self):
+        return {
+            "expenses": ("GET", "expenses:expense-list-create", None),
+            "add-expense": ("POST", "expenses:expense-list-create", self.expense),
+            "balances": ("GET", "expenses:balances", None),
+            "settlements": ("GET", "expenses:suggested-settlements", None),
+            "record-payment": ("POST", "expenses:record-payment", self.payment),
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic group workload and load tests the expense, balance, "
+        "settlement and payment endpoints in a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--groups", type=int, default=5)
+        parser.add_argument("--members", type=int, default=8)
+        parser.add_argument("--expenses", type=int, default=50)
+        parser.add_argument("--payments", type=int, default=10)
+        parser.add_argument("--clients", type=int, default=4)
+        parser.add_argument("--duration", type=float, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--mix",
+            default=DEFAULT_MIX,
+            help=f"Relative weight of each operation (default {DEFAULT_MIX}).",
+        )
+        parser.add_argument(
+            "--in-place",
+            action="store_true",
+            help="Use the configured database instead of a throwaway one.",
+        )
+
+    def handle(self, *args, **options):
+        if options["members"] < 2:
+            raise CommandError("--members must be at least 2.")
+        workload = Workload(options["seed"])
+        operations = workload.operations()
+        weights = self.parse_mix(options["mix"], operations)
+
+        old_name = None
+        if not options["in_place"]:
+            if connection.vendor == "sqlite":
+                # a file, not the in-memory default, so client threads share it,
+                # and writers queue for the lock instead of failing at once
+                connection.settings_dict["TEST"]["NAME"] = "loadtest.sqlite3"
+                connection.settings_dict["OPTIONS"].update(
+                    transaction_mode="IMMEDIATE", timeout=30
+                )
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            # a read replica reads the throwaway database too, as in tests
+            for alias in connections:
+                if connections[alias].settings_dict["TEST"].get("MIRROR") == "default":
+                    connections[alias].creation.set_as_test_mirror(
+                        connection.settings_dict
+                    )
+        try:
+            start = time.perf_counter()
+            self.seed(workload, options)
+            self.stdout.write(
+                f"Seeded {options['groups']} groups x {options['members']} members "
+                f"x {options['expenses']} expenses x {options['payments']} payments "
+                f"in {time.perf_counter() - start:.1f}s on {connection.vendor}"
+            )
+            results = self.run(workload, operations, weights, options)
+            self.report(results, options)
+        finally:
+            if old_name is not None:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def parse_mix(self, mix, operations):
+        weights = {}
+        for part in mix.split(","):
+            name, _, weight = part.partition("=")
+            if name not in operations or not weight.isdigit():
+                raise CommandError(
+                    f"Invalid --mix entry '{part}', expected name=weight with "
+                    f"name one of: {', '.join(operations)}."
+                )
+            weights[name] = int(weight)
+        return weights
+
+    def seed(self, workload, options):
+        suffix = f"{time.time_ns()}"
+        for g in range(options["groups"]):
+            owner = CustomUser.objects.create_user(
+                username=f"loadtest-{suffix}-{g}@example.com",
+                email=f"loadtest-{suffix}-{g}@example.com",
+                name=f"Load Test Owner {g}",
+            )
+            api = ApiClient(owner)
+            response = api.request(
+                "POST", reverse("groups:group-list-create"), {"name": f"Load {g}"}
+            )
+            group_id = response.json()["id"]
+            members_url = reverse("groups:member-list-create", kwargs={"pk": group_id})
+            for m in range(options["members"] - 1):
+                member = {"name": f"Member {m}", "email": f"m{m}-{suffix}@example.com"}
+                api.request("POST", members_url, member)
+            members = [
+                str(pk)
+                for pk in Membership.objects.filter(group_id=group_id).values_list(
+                    "id", flat=True
+                )
+            ]
+            workload.groups.append((owner, group_id, members))
+
+            operations = workload.operations()
+            for name, count in [
+                ("add-expense", options["expenses"]),
+                ("record-payment", options["payments"]),
+            ]:
+                method, url_name, payload = operations[name]
+                url = reverse(url_name, kwargs={"pk": group_id})
+                for _ in range(count):
+                    response = api.request(method, url, payload(members))
+                    if response.status_code >= 400:
+                        raise CommandError(
+                            f"Seeding failed on {name}: "
+                            f"{response.status_code} {response.content[:200]}"
+                        )
+
+    def run(self, workload, operations, weights, options):
+        names, weights = list(weights), list(weights.values())
+        results = {name: [] for name in names}
+        deadline = time.perf_counter() + options["duration"]
+
+        def client(index):
+            rng = random.Random(options["seed"] * 1000 + index)
+            apis = {
+                group_id: ApiClient(owner) for owner, group_id, _ in workload.groups
+            }
+            samples = []
+            try:
+                while time.perf_counter() < deadline:
+                    name = rng.choices(names, weights)[0]
+                    _, group_id, members = rng.choice(workload.groups)
+                    method, url_name, payload = operations[name]
+                    url = reverse(url_name, kwargs={"pk": group_id})
+                    data = payload(members) if payload else None
+                    with QueryStats() as queries:
+                        begin = time.perf_counter()
+                        response = apis[group_id].request(method, url, data)
+                        elapsed = time.perf_counter() - begin
+                    samples.append((name, response.status_code, elapsed, queries.count))
+            finally:
+                with workload.lock:
+                    for name, *sample in samples:
+                        results[name].append(sample)
+
+        def worker(index):
+            try:
+                client(index)
+            finally:
+                # the connections this thread opened, never the caller's
+                connections.close_all()
+
+        if options["clients"] == 1:
+            client(0)
+        else:
+            threads = [
+                threading.Thread(target=worker, args=(i,))
+                for i in range(options["clients"])
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        return results
+
+    def report(self, results, options):
+        duration = options["duration"]
+        self.stdout.write(
+            f"{duration:.0f}s, {options['clients']} clients\n"
+            f"{'operation':<16}{'requests':>9}{'req/s':>9}{'p50 ms':>9}"
+            f"{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'max q':>7}{'errors':>8}"
+        )
+        everything = [sample for samples in results.values() for sample in samples]
+        for name, samples in [*results.items(), ("all", everything)]:
+            latencies = [elapsed * 1000 for _, elapsed, _ in samples]
+            queries = [count for _, _, count in samples]
+            errors = sum(1 for status, _, _ in samples if status >= 400)
+            self.stdout.write(
+                f"{name:<16}{len(samples):>9}{len(samples) / duration:>9.1f}"
+                f"{percentile(latencies, 50):>9.1f}{percentile(latencies, 95):>9.1f}"
+                f"{percentile(latencies, 99):>9.1f}"
+                f"{sum(queries) / max(len(queries), 1):>9.1f}"
+                f"{max(queries, default=0):>7}{errors:>8}"
+            )
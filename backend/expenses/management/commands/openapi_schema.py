@@ -0,0 +1,57 @@
+"""
+Writes the OpenAPI schema of the API to settings.OPENAPI_SCHEMA_FILE (or
+--output), for core.openapi to serve. JSON, or YAML for a .yaml/.yml file.
+
+Generating the schema introspects every view and serializer, so it runs
+once, at image build time (docker/django/Dockerfile), instead of on every
+request. Needs drf_yasg, which the serving workers do not:
+
+    python manage.py openapi_schema
+"""
+
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+
+class Command(BaseCommand):
+    help = "Writes the OpenAPI schema to a static JSON or YAML file."
+    # runs at build time, without the deployment's environment
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", type=Path, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+            from drf_yasg.generators import OpenAPISchemaGenerator
+
+            from core.swagger import api_info
+        except ImportError:
+            raise CommandError("Generating the schema needs drf_yasg installed.")
+
+        # the request the Swagger UI makes for its schema: views look at
+        # request.method. No url, so the schema is relative to where it's served
+        request = APIView().initialize_request(
+            APIRequestFactory().get("/api/swagger/", {"format": "openapi"})
+        )
+        generator = OpenAPISchemaGenerator(api_info, url="")
+        schema = generator.get_schema(request=request, public=True)
+        output = options["output"] or settings.OPENAPI_SCHEMA_FILE
+        if output.suffix in (".yaml", ".yml"):
+            content = OpenAPICodecYaml(validators=[]).encode(schema)
+        else:
+            content = OpenAPICodecJson(validators=[]).encode(schema)
+
+        # replace the file in one step, a running server never reads half of it
+        partial = output.with_name(f".{output.name}.partial")
+        partial.write_bytes(content)
+        os.replace(partial, output)
+        self.stdout.write(
+            f"Wrote {len(schema['paths'])} paths ({len(content)} bytes) to {output}"
+        )
@@ -0,0 +1,95 @@
+"""
+Microbenchmarks of the pure split and settlement functions.
+
+For every size in --sizes it builds random zero-sum balances (and a group of
+that many members) and times, best and median of --repeat runs:
+
+    split       money.expense_balances, equal split of one expense
+    greedy      settlement.min_cash_flow
+    optimal     settlement.optimal_cash_flow (sizes up to --optimal-max only,
+                it is exponential in the number of parties)
+
+along with the number of transfers each solver proposes. No database is
+used. Run it before and after touching money.py or settlement.py:
+
+    python manage.py settlementbench --sizes 10,100,1000,10000,100000
+"""
+
+import random
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from expenses.money import expense_balances
+from expenses.settlement import min_cash_flow, optimal_cash_flow
+
+
+def random_balances(n, rng):
+    """n non-zero balances in minor units, summing to zero."""
+    members = [uuid.UUID(int=rng.getrandbits(128)) for _ in range(n)]
+    amounts = [rng.choice([-1, 1]) * rng.randint(1, 100_000) for _ in range(n - 1)]
+    last = -sum(amounts)
+    if last == 0:
+        # move one unit between two members to keep every balance non-zero
+        amounts[0] += 1 if amounts[0] != -1 else -1
+        last = -sum(amounts)
+    return dict(zip(members, amounts + [last]))
+
+
+def timed(func, repeat):
+    runs, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        runs.append(time.perf_counter() - start)
+    return min(runs), statistics.median(runs), result
+
+
+class Command(BaseCommand):
+    help = "Times the split and settlement functions on 10 to 100k balances."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="10,100,1000,10000,100000")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--optimal-max", type=int, default=16)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options["sizes"].split(",")]
+        except ValueError:
+            raise CommandError("--sizes must be a comma separated list of integers.")
+        if min(sizes) < 2:
+            raise CommandError("Sizes must be at least 2.")
+        rng = random.Random(options["seed"])
+        repeat = options["repeat"]
+
+        self.stdout.write(
+            f"{'size':>8}  {'function':<8}{'best ms':>11}{'median ms':>11}"
+            f"{'transfers':>11}"
+        )
+        for n in sizes:
+            balances = random_balances(n, rng)
+            members = list(balances)
+            amount = rng.randint(1, 10_000_000)
+            rows = [
+                ("split", lambda: expense_balances(amount, members[0], members)),
+                ("greedy", lambda: min_cash_flow(balances)),
+            ]
+            if n <= options["optimal_max"]:
+                rows.append(("optimal", lambda: optimal_cash_flow(balances)))
+            for name, func in rows:
+                # no time budget, the point is to measure the solver itself
+                with override_settings(
+                    SETTLEMENT_OPTIMAL_MAX_PARTIES=n,
+                    SETTLEMENT_OPTIMAL_TIME_BUDGET=float("inf"),
+                ):
+                    best, median, result = timed(func, repeat)
+                transfers = "" if name == "split" else len(result)
+                self.stdout.write(
+                    f"{n:>8}  {name:<8}{best * 1000:>11.3f}{median * 1000:>11.3f}"
+                    f"{transfers:>11}"
+                )
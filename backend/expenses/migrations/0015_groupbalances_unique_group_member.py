@@ -0,0 +1,42 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:29
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_balances(apps, schema_editor):
+    # collapse duplicated (group, member) rows into one before adding the constraint
+    GroupBalances = apps.get_model("expenses", "GroupBalances")
+    duplicates = (
+        GroupBalances.objects.values("group_id", "member_id")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        rows = list(
+            GroupBalances.objects.filter(
+                group_id=dup["group_id"], member_id=dup["member_id"]
+            )
+        )
+        keep = rows[0]
+        keep.balance = sum(r.balance for r in rows)
+        keep.save()
+        GroupBalances.objects.filter(id__in=[r.id for r in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0014_expensebalances"),
+        ("groups", "0007_alter_invitation_invited_by"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_balances, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="groupbalances",
+            constraint=models.UniqueConstraint(
+                fields=("group_id", "member_id"), name="unique_group_member_balance"
+            ),
+        ),
+    ]
@@ -0,0 +1,83 @@
+from decimal import ROUND_FLOOR, ROUND_HALF_UP, Decimal
+from itertools import groupby
+
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+MONEY_FIELDS = [
+    ("Expenses", "amount"),
+    ("ExpensesParticipants", "paid_amt"),
+    ("ExpenseBalances", "balance"),
+    ("TransactionRecords", "payment"),
+    ("GroupBalances", "balance"),
+]
+
+# (model, field, parent): the rows of each parent keep their sum once rounded,
+# balances of an expense and running balances of a group add up to zero
+SUMMED_FIELDS = [
+    ("ExpensesParticipants", "paid_amt", "expense_id"),
+    ("ExpenseBalances", "balance", "expense_id"),
+    ("GroupBalances", "balance", "group_id"),
+]
+
+
+def largest_remainder(values):
+    """
+    Minor units for float major unit `values`, each rounded down or up so that
+    they add up to their rounded sum instead of drifting by a cent or more.
+    """
+    exact = [Decimal(str(v)) * 100 for v in values]
+    target = int(sum(exact).to_integral_value(ROUND_HALF_UP))
+    result = [int(e.to_integral_value(ROUND_FLOOR)) for e in exact]
+    remainders = sorted(
+        range(len(exact)), key=lambda i: exact[i] - result[i], reverse=True
+    )
+    for i in remainders[: target - sum(result)]:
+        result[i] += 1
+    return result
+
+
+def to_minor_units(apps, schema_editor):
+    summed = {model_name for model_name, *_ in SUMMED_FIELDS}
+    for model_name, field in MONEY_FIELDS:
+        if model_name not in summed:
+            model = apps.get_model("expenses", model_name)
+            model.objects.update(**{field: Round(F(field) * 100)})
+
+    for model_name, field, parent in SUMMED_FIELDS:
+        model = apps.get_model("expenses", model_name)
+        parent = model._meta.get_field(parent).attname
+        rows = model.objects.order_by(parent, "pk").only("pk", parent, field)
+        changed = []
+        for _, siblings in groupby(
+            rows.iterator(chunk_size=2000), key=lambda r: getattr(r, parent)
+        ):
+            siblings = list(siblings)
+            values = largest_remainder([getattr(r, field) for r in siblings])
+            for row, value in zip(siblings, values):
+                setattr(row, field, value)
+            changed += siblings
+            if len(changed) >= 2000:
+                model.objects.bulk_update(changed, [field])
+                changed = []
+        model.objects.bulk_update(changed, [field])
+
+
+def to_major_units(apps, schema_editor):
+    for model_name, field in MONEY_FIELDS:
+        model = apps.get_model("expenses", model_name)
+        model.objects.update(**{field: F(field) / 100.0})
+
+
+class Migration(migrations.Migration):
+    # amounts move from float major units to integer minor units (cents);
+    # values are rescaled here, the column type changes in the next migration.
+
+    dependencies = [
+        ("expenses", "0015_groupbalances_unique_group_member"),
+    ]
+
+    operations = [
+        migrations.RunPython(to_minor_units, to_major_units),
+    ]
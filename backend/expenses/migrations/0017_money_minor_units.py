@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0016_convert_money_to_minor_units"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="expensebalances",
+            name="balance",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="expenses",
+            name="amount",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="expensesparticipants",
+            name="paid_amt",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="groupbalances",
+            name="balance",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="transactionrecords",
+            name="payment",
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0017_money_minor_units"),
+        ("groups", "0008_groups_ledger_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="expenses",
+            index=models.Index(
+                fields=["group_id", "created_at", "id"],
+                name="expense_group_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionrecords",
+            index=models.Index(
+                fields=["group_id", "type", "created_at", "id"],
+                name="txn_group_type_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transactionrecords",
+            index=models.Index(
+                fields=["expense_id", "created_at", "id"],
+                name="txn_expense_created_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicates(apps, schema_editor):
+    # ExpenseBalances rows are recomputed on every post, duplicates hold the same value
+    ExpenseBalances = apps.get_model("expenses", "ExpenseBalances")
+    duplicates = (
+        ExpenseBalances.objects.values("expense_id", "member_id")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        ids = list(
+            ExpenseBalances.objects.filter(
+                expense_id=dup["expense_id"], member_id=dup["member_id"]
+            ).values_list("id", flat=True)
+        )
+        ExpenseBalances.objects.filter(id__in=ids[1:]).delete()
+
+    # expenses are kept, repeated titles within a group get a numeric suffix
+    Expenses = apps.get_model("expenses", "Expenses")
+    duplicates = (
+        Expenses.objects.values("group_id", "title")
+        .annotate(rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for dup in duplicates:
+        expenses = Expenses.objects.filter(
+            group_id=dup["group_id"], title=dup["title"]
+        ).order_by("created_at")
+        for n, expense in enumerate(expenses[1:], start=2):
+            suffix = f" ({n})"
+            expense.title = expense.title[: 50 - len(suffix)] + suffix
+            expense.save(update_fields=["title"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("expenses", "0018_pagination_indexes"),
+        ("groups", "0009_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="expensebalances",
+            constraint=models.UniqueConstraint(
+                fields=("expense_id", "member_id"), name="unique_expense_member_balance"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="expenses",
+            constraint=models.UniqueConstraint(
+                fields=("group_id", "title"), name="unique_expense_title_per_group"
+            ),
+        ),
+    ]
@@ -10,11 +10,26 @@ class Expenses(models.Model):
     paid_by = models.ForeignKey(Membership, on_delete=models.CASCADE)
     title = models.CharField(max_length=50)
     description = models.TextField(blank=True, default="")
-    amount = models.FloatField(default=0.00)
+    amount = models.BigIntegerField(default=0)  # minor units (expenses.money)
     created_at = models.DateTimeField(auto_now_add=True)
     added_by = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True)
     is_settled = models.BooleanField(default=False, null=True)
 
+    class Meta:
+        constraints = [
+            # titles are unique per group (ExpensesSerializer.validate)
+            models.UniqueConstraint(
+                fields=["group_id", "title"], name="unique_expense_title_per_group"
+            ),
+        ]
+        indexes = [
+            # cursor pagination of a group's expenses (expenses.pagination)
+            models.Index(
+                fields=["group_id", "created_at", "id"],
+                name="expense_group_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.title}- Amt= {self.amount}"
 
@@ -23,7 +38,7 @@ class ExpensesParticipants(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     expense_id = models.ForeignKey(Expenses, on_delete=models.CASCADE)
     member_id = models.ForeignKey(Membership, on_delete=models.CASCADE)
-    paid_amt = models.FloatField(default=0.00)
+    paid_amt = models.BigIntegerField(default=0)
 
     def __str__(self):
         return f"{self.expense_id.title}-{self.member_id}-share={self.paid_amt}"
@@ -35,7 +50,14 @@ class ExpenseBalances(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     expense_id = models.ForeignKey(Expenses, on_delete=models.CASCADE)
     member_id = models.ForeignKey(Membership, on_delete=models.CASCADE)
-    balance = models.FloatField(default=0.0)
+    balance = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["expense_id", "member_id"], name="unique_expense_member_balance"
+            ),
+        ]
 
     def __str__(self):
         return f"{self.expense_id.title}-{self.member_id.name}-share={self.balance}"
@@ -63,10 +85,23 @@ class TransactionRecords(models.Model):
     recorded_by = models.ForeignKey(
         CustomUser, on_delete=models.CASCADE, related_name="recorded_by", null=True
     )
-    payment = models.FloatField(default=0.0)
+    payment = models.BigIntegerField(default=0)
     type = models.CharField(max_length=1, choices=TYPE, default="P")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # cursor pagination of group history and per-expense transactions
+            models.Index(
+                fields=["group_id", "type", "created_at", "id"],
+                name="txn_group_type_created_idx",
+            ),
+            models.Index(
+                fields=["expense_id", "created_at", "id"],
+                name="txn_expense_created_idx",
+            ),
+        ]
+
     def __str__(self):
         return f" {self.debtor} ---> {self.creditor} || Amt = {self.payment}"
 
@@ -81,7 +116,15 @@ class GroupBalances(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4)
     group_id = models.ForeignKey(Groups, on_delete=models.CASCADE)
     member_id = models.ForeignKey(Membership, on_delete=models.CASCADE)
-    balance = models.FloatField(default=0.0)
+    balance = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # one running balance per member, required by the ledger upsert
+            models.UniqueConstraint(
+                fields=["group_id", "member_id"], name="unique_group_member_balance"
+            ),
+        ]
 
     @property
     def is_settled(self):
@@ -0,0 +1,66 @@
+"""
+Money helpers.
+
+Amounts are stored as integers in minor units (cents) so balances can be
+added, summed in SQL and compared to zero exactly. The API keeps speaking in
+major units; conversion happens in MoneyField (expenses.serializers).
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+DECIMAL_PLACES = 2
+MINOR_PER_MAJOR = 10**DECIMAL_PLACES
+
+
+def to_minor(amount):
+    """Converts a major-unit amount (Decimal/str/int) to integer minor units."""
+    minor = Decimal(str(amount)) * MINOR_PER_MAJOR
+    return int(minor.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_major(minor):
+    """Converts integer minor units back to a Decimal in major units."""
+    return Decimal(minor).scaleb(-DECIMAL_PLACES)
+
+
+def split_amount(amount, keys, weights=None):
+    """
+    Splits an integer `amount` between `keys` proportionally to `weights`
+    (equal shares by default) using largest-remainder rounding, so the shares
+    always add up to `amount` exactly.
+
+    Leftover minor units go to the largest remainders; ties are broken on the
+    key so the same input always gives the same split.
+    """
+    keys = sorted(keys, key=str)
+    if not keys:
+        return {}
+    weights = weights or {k: 1 for k in keys}
+    total = sum(weights[k] for k in keys)
+
+    shares, remainders = {}, []
+    for k in keys:
+        shares[k], rem = divmod(amount * weights[k], total)
+        remainders.append((-rem, str(k), k))
+    leftover = amount - sum(shares.values())
+    for _, _, k in sorted(remainders)[:leftover]:
+        shares[k] += 1
+    return shares
+
+
+def expense_balances(amount, paid_by, members, participants=None):
+    """
+    Returns {member_id: balance} for an expense of `amount` minor units.
+
+    Without `participants` ({member_id: paid_amt}) the amount is split equally
+    between all `members` and credited to `paid_by`; otherwise it is split
+    equally between the participants and each one is credited with what they
+    paid. The balances always sum to exactly zero.
+    """
+    if not participants:
+        shares = split_amount(amount, members)
+        balances = {m: -share for m, share in shares.items()}
+        balances[paid_by] = balances.get(paid_by, 0) + amount
+        return balances
+    shares = split_amount(amount, participants)
+    return {m: participants[m] - share for m, share in shares.items()}
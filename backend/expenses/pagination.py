@@ -0,0 +1,41 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first, backed by the
+    (..., created_at, id) composite indexes so every page is an index range
+    scan no matter how deep the cursor is.
+
+    Every list is paginated: requests without ?page_size= get `page_size`
+    rows, and the rest is reached by following `next`.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def first_page_queryset(self, queryset, request, view=None):
+        """
+        The rows paginate_queryset fetches for a request without a cursor
+        (plus one to tell whether a next page exists). Async views fetch them
+        with the async ORM and pass them to first_page().
+        """
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = None
+        return queryset.order_by(*self.ordering)[: self.page_size + 1]
+
+    def first_page(self, rows):
+        """Sets up the same page and links paginate_queryset would."""
+        self.page = list(rows[: self.page_size])
+        self.has_previous = False
+        self.has_next = len(rows) > self.page_size
+        if self.has_next:
+            self.next_position = self._get_position_from_instance(
+                rows[-1], self.ordering
+            )
+        return self.page
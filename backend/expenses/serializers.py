@@ -1,3 +1,6 @@
+import uuid
+from collections import Counter
+
 from rest_framework import serializers
 from .models import (
     Expenses,
@@ -8,18 +11,140 @@ from .models import (
 )
 
 from groups.models import Groups, Membership
+from groups.permissions import get_group_or_404
 from django.shortcuts import get_object_or_404
 from django.db import transaction
 
+from . import ledger
+from .money import DECIMAL_PLACES, to_major, to_minor
+
+
+class MoneyField(serializers.DecimalField):
+    """
+    Accepts and renders amounts in major units while the model stores integer
+    minor units. Amounts render as JSON numbers unless coerce_to_string=True.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("max_digits", 17)
+        kwargs.setdefault("decimal_places", DECIMAL_PLACES)
+        kwargs.setdefault("coerce_to_string", False)
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        return to_minor(super().to_internal_value(data))
+
+    def to_representation(self, value):
+        return super().to_representation(to_major(value))
+
+
+class MembershipIdField(serializers.PrimaryKeyRelatedField):
+    """
+    A membership given by id. Only the id is parsed here, the memberships of
+    the whole request are fetched and checked against the group together
+    (resolve_members) instead of with a query per field.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            return uuid.UUID(str(data))
+        except ValueError:
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+def resolve_members(group, expenses):
+    """
+    Replaces the paid_by and participant membership ids of validated
+    `expenses` with the group's Membership instances, fetched in one query,
+    and rejects participants listed twice.
+    """
+    ids = set()
+    for attrs in expenses:
+        if "paid_by" in attrs:
+            ids.add(attrs["paid_by"])
+        ids.update(p["member_id"] for p in attrs.get("participants", []))
+    members = Membership.objects.filter(group_id=group).in_bulk(ids)
+
+    for attrs in expenses:
+        if "paid_by" in attrs:
+            attrs["paid_by"] = members.get(attrs["paid_by"])
+            if attrs["paid_by"] is None:
+                raise serializers.ValidationError(
+                    {"paid_by": "Not a member of this group."}
+                )
+        seen = set()
+        for each in attrs.get("participants", []):
+            member_id = each["member_id"]
+            # the balances keep one paid_amt per member (as the import does)
+            if member_id in seen:
+                raise serializers.ValidationError(
+                    {"participants": f"{member_id} is listed twice."}
+                )
+            seen.add(member_id)
+            each["member_id"] = members.get(member_id)
+            if each["member_id"] is None:
+                raise serializers.ValidationError(
+                    "Given Member Id is not a valid membership or is not a member of this group."
+                )
+
 
 class ExpensesParticipantsSerializer(serializers.ModelSerializer):
+    member_id = MembershipIdField(queryset=Membership.objects.all())
+    paid_amt = MoneyField(required=False)
+
     class Meta:
         model = ExpensesParticipants
         fields = ["member_id", "paid_amt"]
 
 
+class ExpensesListSerializer(serializers.ListSerializer):
+    """
+    A batch of new expenses posted as a list to ExpensesView, e.g. replayed by
+    a client that queued them offline. Titles and members are checked in one
+    query each and the expenses inserted in bulk, all of them or none.
+    """
+
+    def validate(self, attrs):
+        if not attrs:
+            return attrs
+        group = attrs[0]["group_id"]
+        titles = Counter(expense.get("title") for expense in attrs)
+        taken = {title for title, count in titles.items() if count > 1}
+        taken.update(
+            Expenses.objects.filter(group_id=group, title__in=titles).values_list(
+                "title", flat=True
+            )
+        )
+        if taken:
+            raise serializers.ValidationError(
+                "Expense with given title already exists in the group: "
+                + ", ".join(sorted(taken))
+            )
+        resolve_members(group, attrs)
+        return attrs
+
+    def create(self, validated_data):
+        expenses, participants = [], []
+        for attrs in validated_data:
+            items = attrs.pop("participants", [])
+            expense = Expenses(**attrs)
+            if items:
+                # as in ExpensesSerializer.create, participants pay the amount
+                expense.amount = sum(p.get("paid_amt", 0) for p in items)
+            expenses.append(expense)
+            participants += [
+                ExpensesParticipants(expense_id=expense, **item) for item in items
+            ]
+        with transaction.atomic():
+            Expenses.objects.bulk_create(expenses)
+            ExpensesParticipants.objects.bulk_create(participants)
+        return expenses
+
+
 class ExpensesSerializer(serializers.ModelSerializer):
+    paid_by = MembershipIdField(queryset=Membership.objects.all())
     participants = ExpensesParticipantsSerializer(many=True, required=False)
+    amount = MoneyField(required=False)
 
     class Meta:
         model = Expenses
@@ -33,6 +158,7 @@ class ExpensesSerializer(serializers.ModelSerializer):
             "created_at",
             "group_id",
         ]
+        list_serializer_class = ExpensesListSerializer
         extra_kwargs = {
             "description": {"required": False},
             "id": {"read_only": True},
@@ -41,31 +167,24 @@ class ExpensesSerializer(serializers.ModelSerializer):
         }
 
     def validate(self, attrs):
-        # to retrive group_id
-        group_id = self.context.get("view").kwargs.get("pk")
-        group = get_object_or_404(Groups, id=group_id)
+        # to retrive group_id (already resolved by the permission check)
+        group = get_group_or_404(self.context.get("request"), self.context.get("view"))
         instance = getattr(self, "instance", None)  # in the case of update
         attrs["group_id"] = group
         attrs["added_by"] = self.context.get("request", None).user
 
-        if (
-            Expenses.objects.filter(group_id=group.id, title=attrs.get("title"))
-            .exclude(pk=getattr(instance, "pk", None))
-            .exists()
-        ):
-            raise serializers.ValidationError(
-                "Expense with given title already exists in the group"
-            )
+        # a batch checks all its expenses at once (ExpensesListSerializer)
+        if not isinstance(self.parent, serializers.ListSerializer):
+            if (
+                Expenses.objects.filter(group_id=group.id, title=attrs.get("title"))
+                .exclude(pk=getattr(instance, "pk", None))
+                .exists()
+            ):
+                raise serializers.ValidationError(
+                    "Expense with given title already exists in the group"
+                )
+            resolve_members(group, [attrs])
 
-        participants = attrs.get("participants", [])
-        if participants:
-            for each in participants:
-                member = each.get("member_id")
-                # member_id becomes member instance after serialization
-                if member.group_id != group:
-                    raise serializers.ValidationError(
-                        "Given Member Id is not a valid membership or is not a member of this group."
-                    )
         amt = attrs.get("amount")
 
         if amt is not None:
@@ -75,20 +194,19 @@ class ExpensesSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         participants = validated_data.pop("participants", [])
+        if participants:
+            # participants pay the amount
+            validated_data["amount"] = sum(p.get("paid_amt", 0) for p in participants)
 
         # create expense instance and participants if any
         with transaction.atomic():
             expense_instance = super().create(validated_data)
-            if participants:
-                total_paid = 0
-                for individual in participants:
-                    participant = ExpensesParticipants.objects.create(
-                        expense_id=expense_instance,
-                        **individual,
-                    )
-                    total_paid += participant.paid_amt
-                expense_instance.amount = total_paid
-                expense_instance.save()
+            ExpensesParticipants.objects.bulk_create(
+                [
+                    ExpensesParticipants(expense_id=expense_instance, **individual)
+                    for individual in participants
+                ]
+            )
         return expense_instance
 
     def update(self, instance, validated_data):
@@ -101,34 +219,41 @@ class ExpensesSerializer(serializers.ModelSerializer):
             )
             instance.amount = validated_data.get("amount", instance.amount)
 
-            # get existing participants member_ids and new coming participnats member ids
-            existing_participants = [
-                p.member_id for p in instance.expensesparticipants_set.all()
-            ]
-
-            new_participants = [p.get("member_id") for p in participants]
+            # diff the sent participants against the existing ones in memory
+            existing = {
+                p.member_id_id: p for p in instance.expensesparticipants_set.all()
+            }
+            # one entry per member, participants listed twice were rejected by
+            # validate (resolve_members)
+            sent = {p["member_id"].id: p for p in participants}
 
             # delete the unsent participants
-            for m_id in existing_participants:
-                if m_id not in new_participants:
-                    ExpensesParticipants.objects.filter(
-                        expense_id=instance, member_id=m_id
-                    ).delete()
-            if participants:
-                total_paid = 0
-                for individual in participants:
-                    participant, created = ExpensesParticipants.objects.get_or_create(
-                        expense_id=instance,
-                        member_id=individual.pop("member_id"),
-                        defaults={**individual},
+            removed = existing.keys() - sent.keys()
+            if removed:
+                ExpensesParticipants.objects.filter(
+                    expense_id=instance, member_id__in=removed
+                ).delete()
+
+            new, changed = [], []
+            for member_id, individual in sent.items():
+                paid_amt = individual.get("paid_amt", 0)
+                participant = existing.get(member_id)
+                if participant is None:
+                    new.append(
+                        ExpensesParticipants(
+                            expense_id=instance,
+                            member_id=individual["member_id"],
+                            paid_amt=paid_amt,
+                        )
                     )
-
-                    if not created:
-                        participant.paid_amt = individual.get("paid_amt")
-                        participant.save()
-
-                    total_paid += participant.paid_amt
-                instance.amount = total_paid
+                elif participant.paid_amt != paid_amt:
+                    participant.paid_amt = paid_amt
+                    changed.append(participant)
+            ExpensesParticipants.objects.bulk_create(new)
+            ExpensesParticipants.objects.bulk_update(changed, ["paid_amt"])
+
+            if sent:
+                instance.amount = sum(p.get("paid_amt", 0) for p in sent.values())
             instance.save()
 
         return instance
@@ -139,6 +264,7 @@ class ExpensesDetailSerializer(serializers.ModelSerializer):
     participants = ExpensesParticipantsSerializer(
         many=True, source="expensesparticipants_set"
     )
+    amount = MoneyField()
     added_by_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -158,10 +284,15 @@ class ExpensesDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_added_by_name(self, obj):
-        return obj.added_by.name
+        # annotated by the views (added_by__name) so the user is not loaded per row
+        if hasattr(obj, "added_by_name"):
+            return obj.added_by_name
+        return obj.added_by.name if obj.added_by else None
 
 
 class ExpenseBalanceSerializer(serializers.ModelSerializer):
+    balance = MoneyField(coerce_to_string=True)
+
     class Meta:
         model = ExpenseBalances
         fields = "__all__"
@@ -182,6 +313,8 @@ class ExpenseBalanceSerializer(serializers.ModelSerializer):
 
 
 class TransactionRecordsSerializer(serializers.ModelSerializer):
+    payment = MoneyField()
+
     class Meta:
         model = TransactionRecords
         fields = "__all__"
@@ -193,36 +326,42 @@ class TransactionRecordsSerializer(serializers.ModelSerializer):
 
 
 class GroupBalancesSerializer(serializers.ModelSerializer):
+    # balances were always returned as strings to the frontend
+    balance = MoneyField(coerce_to_string=True)
+
     class Meta:
         model = GroupBalances
         fields = "__all__"
+        # (group_id, member_id) is unique, create() accumulates onto the existing row
+        validators = []
 
     def create(self, validated_data):
         group = validated_data.pop("group_id")
         member = validated_data.pop("member_id")
-        balance_instance, created = GroupBalances.objects.get_or_create(
-            group_id=group, member_id=member, defaults={**validated_data}
+        ledger.apply_group_balance_deltas(
+            group.id, {member.id: validated_data.get("balance")}
         )
-        if not created:
-            balance_instance.balance += validated_data.get("balance")
-        # Using tolerance comparison to tolerate tiny numbers which are equivalent to zero to solve classic floating-point representation error. 0.64+4e ~=0
-        if abs(balance_instance.balance) < 0.00001:
-            balance_instance.balance = 0
-        balance_instance.save()
-        return balance_instance
+        return GroupBalances.objects.get(group_id=group, member_id=member)
 
     # def update(self, instance, validated_data):
     #     return super().update(instance, validated_data)
 
 
-class RecordPaymentSerializer(serializers.Serializer):
+class SettlementSerializer(serializers.Serializer):
     debtor = serializers.UUIDField()  # payer
     creditor = serializers.UUIDField()  # receiver
-    payment = serializers.FloatField()
+    payment = MoneyField()
+
+
+class RecordPaymentSerializer(SettlementSerializer):
 
     def validate(self, attrs):
         if attrs.get("payment") <= 0:
             raise serializers.ValidationError(
                 {"payment": "Payment amount must be greater than 0."}
             )
+        if attrs.get("debtor") == attrs.get("creditor"):
+            raise serializers.ValidationError(
+                {"creditor": "Payer and receiver must be different members."}
+            )
         return super().validate(attrs)
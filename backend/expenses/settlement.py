@@ -0,0 +1,172 @@
+import heapq
+import time
+from collections import namedtuple
+
+from django.conf import settings
+
+from core.metrics import SETTLEMENT_DURATION, SETTLEMENT_PARTIES
+
+
+def min_cash_flow(balances):
+    """
+    Greedy settlement: repeatedly matches the largest creditor with the largest
+    debtor and returns the transactions list.
+
+    balance -> +ve means , others have to pay back to him
+    balance -> -ve means , he has to pay others to him
+    balance -> 0 means already settled
+
+    Both sides are kept in max-heaps so every round is O(log n). Ties on the
+    amount are broken on the member id so the output is deterministic.
+    """
+    transactions = []
+    # heapq is a min-heap, so amounts are pushed negated to pop the largest first
+    creditors = [(-bal, str(m), m) for m, bal in balances.items() if bal > 0]
+    debtors = [(bal, str(m), m) for m, bal in balances.items() if bal < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    while creditors and debtors:
+        # retrieve highest creditor and debtor
+        neg_credit, c_key, creditor = heapq.heappop(creditors)
+        neg_debit, d_key, debtor = heapq.heappop(debtors)
+        credit_amt, debit_amt = -neg_credit, -neg_debit
+
+        payment = min(credit_amt, debit_amt)
+        transactions.append(
+            {"debtor": debtor, "creditor": creditor, "payment": payment}
+        )
+
+        # push back whoever is left with an outstanding amount
+        credit_amt -= payment
+        debit_amt -= payment
+        if credit_amt > 0:
+            heapq.heappush(creditors, (-credit_amt, c_key, creditor))
+        if debit_amt > 0:
+            heapq.heappush(debtors, (-debit_amt, d_key, debtor))
+    return transactions
+
+
+class SettlementTimeout(Exception):
+    """Raised when an exact solver runs out of its time budget."""
+
+
+def optimal_cash_flow(balances):
+    """
+    Exact settlement with the minimum number of transfers.
+
+    n non-zero balances settled as k independent zero-sum subsets need n - k
+    transfers, so the optimum is the partition into the most zero-sum subsets.
+    dp[mask] is the largest number of zero-sum subsets the members in `mask`
+    can be split into; it is filled for every subset (O(2^n * n)), then the
+    best removal order is walked back to recover the subsets, and each one is
+    settled with the greedy solver (which needs at most size - 1 transfers).
+
+    Raises SettlementTimeout when there are more than
+    settings.SETTLEMENT_OPTIMAL_MAX_PARTIES non-zero balances or when the
+    settings.SETTLEMENT_OPTIMAL_TIME_BUDGET seconds of CPU time of the calling
+    thread run out (not of the process, other requests must not eat into it).
+    """
+    parties = sorted(
+        ((m, bal) for m, bal in balances.items() if bal), key=lambda x: str(x[0])
+    )
+    n = len(parties)
+    if n > getattr(settings, "SETTLEMENT_OPTIMAL_MAX_PARTIES", 20):
+        raise SettlementTimeout(f"{n} parties is above the exact solver limit")
+    deadline = time.thread_time() + getattr(
+        settings, "SETTLEMENT_OPTIMAL_TIME_BUDGET", 0.5
+    )
+
+    amounts = [bal for _, bal in parties]
+    full = (1 << n) - 1
+    sums = [0] * (full + 1)
+    dp = [0] * (full + 1)
+    for mask in range(1, full + 1):
+        if not mask & 0xFFF and time.thread_time() > deadline:
+            raise SettlementTimeout("time budget exhausted")
+        low = mask & -mask
+        sums[mask] = sums[mask ^ low] + amounts[low.bit_length() - 1]
+        best, rest = 0, mask
+        while rest:
+            bit = rest & -rest
+            if dp[mask ^ bit] > best:
+                best = dp[mask ^ bit]
+            rest ^= bit
+        dp[mask] = best + (sums[mask] == 0)
+
+    # walk back from the full set, always removing a member that keeps the
+    # optimum; the prefixes (in insertion order) hit zero once per subset
+    order, mask = [], full
+    while mask:
+        target = dp[mask] - (sums[mask] == 0)
+        rest = mask
+        while rest:
+            bit = rest & -rest
+            if dp[mask ^ bit] == target:
+                break
+            rest ^= bit
+        order.append(bit.bit_length() - 1)
+        mask ^= bit
+
+    transactions, subset, running = [], {}, 0
+    for i in reversed(order):
+        member, bal = parties[i]
+        subset[member] = bal
+        running += bal
+        if running == 0:
+            transactions += min_cash_flow(subset)
+            subset = {}
+    if subset:
+        # only reachable when the balances do not sum to zero
+        transactions += min_cash_flow(subset)
+    return transactions
+
+
+# available settlement algorithms, keyed by the name used in settings.
+SETTLEMENT_SOLVERS = {
+    "greedy": min_cash_flow,
+    "optimal": optimal_cash_flow,
+}
+
+SettlementResult = namedtuple(
+    "SettlementResult", ["transactions", "algorithm", "elapsed_ms"]
+)
+
+
+def get_settlement_solver(name=None):
+    """
+    Returns the solver registered under `name`, falling back to
+    settings.SETTLEMENT_SOLVER (default "greedy").
+    """
+    name = name or getattr(settings, "SETTLEMENT_SOLVER", "greedy")
+    try:
+        return SETTLEMENT_SOLVERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown settlement solver '{name}'")
+
+
+def run_settlement(balances, solver=None):
+    """
+    Runs the requested solver and reports which algorithm produced the
+    answer and how long it took (also recorded in the /metrics histograms).
+    A solver that raises SettlementTimeout falls back to the greedy result.
+    """
+    name = solver or getattr(settings, "SETTLEMENT_SOLVER", "greedy")
+    solve = get_settlement_solver(name)
+    start = time.perf_counter()
+    try:
+        transactions = solve(balances)
+    except SettlementTimeout:
+        name, transactions = "greedy", min_cash_flow(balances)
+    elapsed = time.perf_counter() - start
+    SETTLEMENT_DURATION.labels(name).observe(elapsed)
+    SETTLEMENT_PARTIES.labels(name).observe(sum(1 for bal in balances.values() if bal))
+    return SettlementResult(transactions, name, elapsed * 1000)
+
+
+def suggest_settlements(balances, solver=None):
+    """
+    Entry point used by the views: runs the configured solver on a
+    {member_id: balance} dict and returns the transactions list.
+    """
+    return run_settlement(balances, solver).transactions
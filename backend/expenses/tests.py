@@ -1,3 +1,1060 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import uuid
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, quote, urlparse
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, force_authenticate
+from rest_framework_simplejwt.tokens import AccessToken
+
+from groups.models import Groups, Membership
+from core.testing import GroupFixtureMixin, QueryPlanMixin
+from users.models import CustomUser
+
+from .async_views import (
+    AsyncExpensesView,
+    AsyncGroupBalanceView,
+    AsyncSuggestedSettlementsView,
+)
+from . import ledger
+from .views import GroupLedgerExportView
+from .models import ExpenseBalances, Expenses, GroupBalances, TransactionRecords
+from .pagination import CreatedAtCursorPagination
+from .management.commands.settlementbench import random_balances
+from .money import expense_balances, split_amount, to_major, to_minor
+from .settlement import (
+    min_cash_flow,
+    optimal_cash_flow,
+    run_settlement,
+    suggest_settlements,
+)
+
+
+class MinCashFlowTests(SimpleTestCase):
+    def test_largest_parties_are_matched_each_round(self):
+        balances = {"a": 60, "b": 30, "c": 10, "d": -50, "e": -40, "f": -10}
+        transactions = min_cash_flow(balances)
+        self.assertEqual(
+            transactions[:2],
+            [
+                {"debtor": "d", "creditor": "a", "payment": 50},
+                {"debtor": "e", "creditor": "b", "payment": 30},
+            ],
+        )
+        # every balance is brought back to zero
+        remaining = dict(balances)
+        for t in transactions:
+            remaining[t["debtor"]] += t["payment"]
+            remaining[t["creditor"]] -= t["payment"]
+        self.assertTrue(all(v == 0 for v in remaining.values()))
+
+    def test_ties_are_broken_on_member_id(self):
+        balances = {"b": 10, "a": 10, "d": -10, "c": -10}
+        self.assertEqual(
+            min_cash_flow(balances),
+            [
+                {"debtor": "c", "creditor": "a", "payment": 10},
+                {"debtor": "d", "creditor": "b", "payment": 10},
+            ],
+        )
+
+    def test_unknown_solver_is_rejected(self):
+        with self.assertRaises(ValueError):
+            suggest_settlements({}, solver="nope")
+
+
+class OptimalCashFlowTests(SimpleTestCase):
+    # greedy settles this with 4 transfers, {a, d} and {b, c, e} need only 3
+    balances = {"a": 8, "b": -2, "c": -7, "d": -8, "e": 9}
+
+    def test_finds_minimum_number_of_transfers(self):
+        self.assertEqual(len(min_cash_flow(self.balances)), 4)
+        transactions = optimal_cash_flow(self.balances)
+        self.assertEqual(len(transactions), 3)
+        remaining = dict(self.balances)
+        for t in transactions:
+            remaining[t["debtor"]] += t["payment"]
+            remaining[t["creditor"]] -= t["payment"]
+        self.assertTrue(all(v == 0 for v in remaining.values()))
+
+    def test_reports_algorithm(self):
+        result = run_settlement(self.balances, "optimal")
+        self.assertEqual(result.algorithm, "optimal")
+        self.assertEqual(len(result.transactions), 3)
+
+    @override_settings(SETTLEMENT_OPTIMAL_MAX_PARTIES=3)
+    def test_falls_back_to_greedy_over_the_limit(self):
+        result = run_settlement(self.balances, "optimal")
+        self.assertEqual(result.algorithm, "greedy")
+        self.assertEqual(result.transactions, min_cash_flow(self.balances))
+
+    @override_settings(SETTLEMENT_OPTIMAL_TIME_BUDGET=0)
+    def test_falls_back_to_greedy_when_budget_runs_out(self):
+        balances = {i: (i % 7) - 3 for i in range(16)}
+        balances[16] = -sum(balances.values())
+        result = run_settlement(balances, "optimal")
+        self.assertEqual(result.algorithm, "greedy")
+
+
+class MoneyTests(SimpleTestCase):
+    def test_split_amount_uses_largest_remainder(self):
+        self.assertEqual(
+            split_amount(1000, ["c", "a", "b"]), {"a": 334, "b": 333, "c": 333}
+        )
+        shares = split_amount(1001, ["a", "b", "c"], weights={"a": 1, "b": 1, "c": 2})
+        self.assertEqual(shares, {"a": 250, "b": 250, "c": 501})
+        self.assertEqual(sum(shares.values()), 1001)
+
+    def test_minor_unit_conversion(self):
+        self.assertEqual(to_minor("12.345"), 1235)
+        self.assertEqual(to_minor(0.1), 10)
+        self.assertEqual(str(to_major(-1250)), "-12.50")
+
+
+class SettlementPropertyTests(SimpleTestCase):
+    """Randomized checks of the invariants every solver must keep."""
+
+    cases = 200
+
+    def assertSettles(self, balances, transactions):
+        parties = sum(1 for bal in balances.values() if bal)
+        self.assertLessEqual(len(transactions), max(parties - 1, 0))
+        settled = dict(balances)
+        for t in transactions:
+            self.assertGreater(t["payment"], 0)
+            settled[t["debtor"]] += t["payment"]
+            settled[t["creditor"]] -= t["payment"]
+        # every balance ends at exactly zero ...
+        self.assertEqual(set(settled.values()), {0} if settled else set())
+        # ... and nobody both pays and receives
+        payers = {t["debtor"] for t in transactions}
+        receivers = {t["creditor"] for t in transactions}
+        self.assertFalse(payers & receivers)
+
+    def test_greedy(self):
+        rng = random.Random(17)
+        for _ in range(self.cases):
+            balances = random_balances(rng.randint(2, 60), rng)
+            # some members already settled
+            balances.update({uuid.uuid4(): 0 for _ in range(rng.randint(0, 3))})
+            self.assertSettles(balances, min_cash_flow(balances))
+
+    def test_optimal_is_never_worse_than_greedy(self):
+        rng = random.Random(18)
+        for _ in range(self.cases):
+            balances = random_balances(rng.randint(2, 10), rng)
+            transactions = optimal_cash_flow(balances)
+            self.assertSettles(balances, transactions)
+            self.assertLessEqual(len(transactions), len(min_cash_flow(balances)))
+
+    def test_expense_balances_sum_to_zero(self):
+        rng = random.Random(19)
+        for _ in range(self.cases):
+            members = [uuid.uuid4() for _ in range(rng.randint(1, 40))]
+            amount = rng.randint(1, 10_000_000)
+            balances = expense_balances(amount, rng.choice(members), members)
+            self.assertEqual(sum(balances.values()), 0)
+            shares = split_amount(amount, members).values()
+            self.assertLessEqual(max(shares) - min(shares), 1)
+
+            payers = rng.sample(members, rng.randint(1, len(members)))
+            paid = {m: rng.randint(0, 50_000) for m in payers}
+            balances = expense_balances(sum(paid.values()), None, [], paid)
+            self.assertEqual(sum(balances.values()), 0)
+
+
+class LedgerPostingTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def post_expense(self, group, payer, title="Dinner", amount=90):
+        url = reverse("expenses:expense-list-create", kwargs={"pk": group.id})
+        data = {"title": title, "paid_by": str(payer.id), "amount": amount}
+        return self.client.post(url, data, format="json")
+
+    def test_expense_is_split_across_group(self):
+        group, (owner, *_) = self.make_group(3)
+        response = self.post_expense(group, owner)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        balances = dict(
+            GroupBalances.objects.filter(group_id=group).values_list(
+                "member_id", "balance"
+            )
+        )
+        self.assertEqual(len(balances), 3)
+        self.assertEqual(balances[owner.id], 6000)
+        self.assertEqual(sum(balances.values()), 0)
+        self.assertEqual(
+            TransactionRecords.objects.filter(expense_id=response.data["id"]).count(),
+            2,
+        )
+
+    def test_large_balance_updates_are_upserted_in_batches(self):
+        group, (owner, *_) = self.make_group(1)
+        members = Membership.objects.bulk_create(
+            [
+                Membership(email=f"m{i}@example.com", group_id=group)
+                for i in range(ledger.UPSERT_BATCH_SIZE * 2 + 50)
+            ]
+        )
+        deltas = {m.id: i + 1 for i, m in enumerate(members)}
+        deltas[owner.id] = -sum(deltas.values())
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as ctx:
+                ledger.apply_group_balance_deltas(group.id, deltas)
+            upserts = [q for q in ctx.captured_queries if "ON CONFLICT" in q["sql"]]
+            self.assertEqual(len(upserts), 3)
+        balances = dict(
+            GroupBalances.objects.filter(group_id=group).values_list(
+                "member_id", "balance"
+            )
+        )
+        self.assertEqual(balances, {m: 2 * d for m, d in deltas.items()})
+        group.refresh_from_db()
+        self.assertEqual(group.ledger_version, 2)
+
+    def test_posting_query_count_does_not_grow_with_group(self):
+        counts = []
+        for size in (3, 30):
+            group, (owner, *_) = self.make_group(size, name=f"group-{size}")
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.post_expense(group, owner)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_update_reverses_previous_balances(self):
+        group, (owner, *_) = self.make_group(3)
+        other = Membership.objects.filter(group_id=group).exclude(id=owner.id).first()
+        expense_id = self.post_expense(group, owner).data["id"]
+        url = reverse(
+            "expenses:expense-create-update",
+            kwargs={"pk": group.id, "id": expense_id},
+        )
+        data = {"title": "Dinner", "paid_by": str(other.id), "amount": 30}
+        response = self.client.put(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        balances = dict(
+            GroupBalances.objects.filter(group_id=group).values_list(
+                "member_id", "balance"
+            )
+        )
+        self.assertEqual(balances[other.id], 2000)
+        self.assertEqual(balances[owner.id], -1000)
+        self.assertEqual(sum(balances.values()), 0)
+
+    def test_record_payment_accumulates_onto_existing_balance(self):
+        group, (owner, *_) = self.make_group(3)
+        other = Membership.objects.filter(group_id=group).exclude(id=owner.id).first()
+        self.post_expense(group, owner)
+        url = reverse("expenses:record-payment", kwargs={"pk": group.id})
+        data = {"debtor": str(other.id), "creditor": str(owner.id), "payment": 30}
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        balances = dict(
+            GroupBalances.objects.filter(group_id=group).values_list(
+                "member_id", "balance"
+            )
+        )
+        self.assertEqual(len(balances), 3)
+        self.assertEqual(balances[owner.id], 3000)
+        self.assertEqual(balances[other.id], 0)
+
+    def test_record_payment_to_self_is_rejected(self):
+        group, (owner, *_) = self.make_group(3)
+        self.post_expense(group, owner)
+        url = reverse("expenses:record-payment", kwargs={"pk": group.id})
+        data = {"debtor": str(owner.id), "creditor": str(owner.id), "payment": 30}
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(TransactionRecords.objects.filter(group_id=group).exists())
+        balances = GroupBalances.objects.filter(group_id=group)
+        self.assertEqual(sum(balances.values_list("balance", flat=True)), 0)
+
+    def test_amounts_are_rendered_in_major_units(self):
+        group, (owner, *_) = self.make_group(3)
+        response = self.post_expense(group, owner, amount="100.00")
+        self.assertEqual(response.data["amount"], Decimal("100.00"))
+        balances = self.client.get(
+            reverse("expenses:balances", kwargs={"pk": group.id})
+        ).data
+        # 100.00 / 3 leaves one cent over, handed to exactly one member
+        amounts = sorted(Decimal(b["balance"]) for b in balances)
+        self.assertIn(amounts[-1], (Decimal("66.66"), Decimal("66.67")))
+        self.assertEqual(sum(amounts), 0)
+        settlements = self.client.get(
+            reverse("expenses:suggested-settlements", kwargs={"pk": group.id})
+        ).data
+        self.assertEqual(sum(t["payment"] for t in settlements), amounts[-1])
+
+    def test_suggested_settlements_are_cached_per_ledger_version(self):
+        group, (owner, *_) = self.make_group(3)
+        other = Membership.objects.filter(group_id=group).exclude(id=owner.id).first()
+        self.post_expense(group, owner)
+        url = reverse("expenses:suggested-settlements", kwargs={"pk": group.id})
+        first = self.client.get(url).data
+        self.assertEqual(len(first), 2)
+        # the group context query is the only SQL on a cache hit
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url).data, first)
+
+        # a recorded payment bumps the version and invalidates the cached result
+        payment_url = reverse("expenses:record-payment", kwargs={"pk": group.id})
+        data = {"debtor": str(other.id), "creditor": str(owner.id), "payment": 30}
+        self.client.post(payment_url, data, format="json")
+        self.assertEqual(len(self.client.get(url).data), 1)
+
+    def test_settlement_mode_is_validated_and_reported(self):
+        group, (owner, *_) = self.make_group(3)
+        self.post_expense(group, owner)
+        url = reverse("expenses:suggested-settlements", kwargs={"pk": group.id})
+        response = self.client.get(url, {"mode": "optimal"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Settlement-Algorithm"], "optimal")
+        self.assertIn("X-Settlement-Time-Ms", response)
+        self.assertNotIn("X-Settlement-Cache", response)
+        # a cached answer doesn't report a solve that did not happen
+        response = self.client.get(url, {"mode": "optimal"})
+        self.assertEqual(response["X-Settlement-Algorithm"], "optimal")
+        self.assertEqual(response["X-Settlement-Cache"], "hit")
+        self.assertNotIn("X-Settlement-Time-Ms", response)
+        response = self.client.get(url, {"mode": "fastest"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expense_list_is_cursor_paginated(self):
+        group, (owner, *_) = self.make_group(3)
+        for i in range(5):
+            self.post_expense(group, owner, title=f"Expense {i}")
+        url = reverse("expenses:expense-list-create", kwargs={"pk": group.id})
+        # lists are paginated even when the client does not ask for it
+        with mock.patch.object(CreatedAtCursorPagination, "page_size", 3):
+            page = self.client.get(url).data
+        self.assertEqual(len(page["results"]), 3)
+        self.assertIsNotNone(page["next"])
+
+        titles, params = [], {"page_size": 2}
+        while True:
+            page = self.client.get(url, params).data
+            titles += [e["title"] for e in page["results"]]
+            if not page["next"]:
+                break
+            params = {"cursor": parse_qs(urlparse(page["next"]).query)["cursor"][0]}
+        self.assertEqual(titles, [f"Expense {i}" for i in reversed(range(5))])
+
+
+class ExpenseQueryCountTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.group, self.members = self.make_group(4)
+        self.owner = self.members[0]
+        self.list_url = reverse(
+            "expenses:expense-list-create", kwargs={"pk": self.group.id}
+        )
+
+    def add_expenses(self, count):
+        start = Expenses.objects.filter(group_id=self.group).count()
+        for i in range(start, start + count):
+            participants = [
+                {"member_id": str(m.id), "paid_amt": 10 if m == self.owner else 0}
+                for m in self.members
+            ]
+            data = {
+                "title": f"Expense {i}",
+                "paid_by": str(self.owner.id),
+                "participants": participants,
+            }
+            response = self.client.post(self.list_url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_list_query_count_does_not_depend_on_size(self):
+        # 1 for the group context, 1 for the expenses, 1 for the participants
+        self.add_expenses(2)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.list_url)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.add_expenses(8)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.list_url)
+        results = response.data["results"]
+        self.assertEqual(len(results), 10)
+        self.assertEqual(results[0]["added_by_name"], "Owner")
+        self.assertEqual(len(results[0]["participants"]), 4)
+        with self.assertNumQueries(3):
+            self.client.get(self.list_url, {"page_size": 5})
+
+    def test_detail_query_count(self):
+        self.add_expenses(1)
+        expense = Expenses.objects.get(group_id=self.group)
+        url = reverse(
+            "expenses:expense-create-update",
+            kwargs={"pk": self.group.id, "id": expense.id},
+        )
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.data["added_by_name"], "Owner")
+        self.assertEqual(len(response.data["participants"]), 4)
+
+    def test_create_query_count_does_not_depend_on_participants(self):
+        def post(title, members):
+            data = {
+                "title": title,
+                "paid_by": str(self.owner.id),
+                "participants": [
+                    {"member_id": str(m.id), "paid_amt": 1} for m in members
+                ],
+            }
+            return self.client.post(self.list_url, data, format="json")
+
+        with CaptureQueriesContext(connection) as small:
+            post("Small", self.members[:2])
+        self.members += [
+            Membership.objects.create(email=f"n{i}@example.com", group_id=self.group)
+            for i in range(40)
+        ]
+        with CaptureQueriesContext(connection) as large:
+            response = post("Large", self.members)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small), len(large))
+
+    def test_update_rejects_participants_listed_twice(self):
+        first = self.members[1]
+        data = {
+            "title": "Taxi",
+            "paid_by": str(self.owner.id),
+            "participants": [
+                {"member_id": str(self.owner.id), "paid_amt": 5},
+                {"member_id": str(first.id), "paid_amt": 3},
+            ],
+        }
+        expense_id = self.client.post(self.list_url, data, format="json").data["id"]
+        url = reverse(
+            "expenses:expense-create-update",
+            kwargs={"pk": self.group.id, "id": expense_id},
+        )
+        data["participants"].append({"member_id": str(first.id), "paid_amt": 7})
+        response = self.client.put(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("participants", response.data)
+
+        expense = Expenses.objects.get(id=expense_id)
+        self.assertEqual(expense.amount, to_minor(8))
+        self.assertEqual(
+            dict(expense.expensesparticipants_set.values_list("member_id", "paid_amt")),
+            {self.owner.id: to_minor(5), first.id: to_minor(3)},
+        )
+
+    def test_update_query_count_does_not_depend_on_participants(self):
+        def put(title, before, after):
+            participants = [{"member_id": str(m.id), "paid_amt": 1} for m in before]
+            data = {
+                "title": title,
+                "paid_by": str(self.owner.id),
+                "participants": participants,
+            }
+            expense_id = self.client.post(self.list_url, data, format="json").data["id"]
+            url = reverse(
+                "expenses:expense-create-update",
+                kwargs={"pk": self.group.id, "id": expense_id},
+            )
+            # some participants leave, some join, the rest pay more
+            data["participants"] = [
+                {"member_id": str(m.id), "paid_amt": i % 3} for i, m in enumerate(after)
+            ]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.put(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            expense = Expenses.objects.get(id=expense_id)
+            self.assertEqual(
+                expense.amount, to_minor(sum(i % 3 for i in range(len(after))))
+            )
+            self.assertEqual(
+                ledger.get_expense_balances(expense),
+                ledger.compute_expense_balances(expense),
+            )
+            return queries
+
+        small = put("Small", self.members[:3], self.members[1:])
+        self.members += [
+            Membership.objects.create(email=f"n{i}@example.com", group_id=self.group)
+            for i in range(40)
+        ]
+        large = put("Large", self.members[:30], self.members[10:])
+        self.assertEqual(len(small), len(large))
+
+        totals = {}
+        for expense in Expenses.objects.filter(group_id=self.group):
+            for member, balance in ledger.get_expense_balances(expense).items():
+                totals[member] = totals.get(member, 0) + balance
+        balances = dict(
+            GroupBalances.objects.filter(group_id=self.group).values_list(
+                "member_id", "balance"
+            )
+        )
+        self.assertEqual(
+            {m: b for m, b in balances.items() if b},
+            {m: b for m, b in totals.items() if b},
+        )
+
+    def test_members_of_other_groups_are_rejected(self):
+        other = Groups.objects.create(name="other", admin=self.user)
+        stranger = Membership.objects.create(email="s@example.com", group_id=other)
+        for paid_by, participant in [(stranger, self.owner), (self.owner, stranger)]:
+            data = {
+                "title": "Taxi",
+                "paid_by": str(paid_by.id),
+                "participants": [{"member_id": str(participant.id), "paid_amt": 5}],
+            }
+            response = self.client.post(self.list_url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data["participants"][0]["member_id"] = "not-an-id"
+        response = self.client.post(self.list_url, data, format="json")
+        self.assertIn("participants", response.data)
+        self.assertFalse(Expenses.objects.filter(group_id=self.group).exists())
+
+    def test_participants_listed_twice_are_rejected(self):
+        first = self.members[1]
+        expense = {
+            "title": "Taxi",
+            "paid_by": str(self.owner.id),
+            "participants": [
+                {"member_id": str(self.owner.id), "paid_amt": 5},
+                {"member_id": str(first.id), "paid_amt": 3},
+                {"member_id": str(self.owner.id), "paid_amt": 2},
+            ],
+        }
+        for data in (expense, [expense]):
+            response = self.client.post(self.list_url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("participants", response.data)
+        self.assertFalse(Expenses.objects.filter(group_id=self.group).exists())
+        self.assertFalse(GroupBalances.objects.filter(group_id=self.group).exists())
+
+
+class HotPathIndexTests(QueryPlanMixin, TestCase):
+    """EXPLAIN the ledger lookups done by the expense endpoints."""
+
+    def test_lookups_use_their_index(self):
+        group_id, expense_id = uuid.uuid4(), uuid.uuid4()
+        self.assertUsesIndex(
+            Expenses.objects.filter(group_id=group_id, title="Rent"),
+            "unique_expense_title_per_group",
+        )
+        self.assertUsesIndex(
+            Expenses.objects.filter(group_id=group_id).order_by("-created_at", "-id"),
+            "expense_group_created_idx",
+        )
+        self.assertUsesIndex(
+            TransactionRecords.objects.filter(group_id=group_id, type="A"),
+            "txn_group_type_created_idx",
+        )
+        self.assertUsesIndex(
+            TransactionRecords.objects.filter(expense_id=expense_id),
+            "txn_expense_created_idx",
+        )
+        # the (parent, member) unique constraints are for integrity, lookups by
+        # parent go through the narrower foreign key indexes
+        self.assertUsesIndex(
+            ExpenseBalances.objects.filter(expense_id=expense_id),
+            self.foreign_key_index(ExpenseBalances, "expense_id"),
+        )
+        self.assertUsesIndex(
+            GroupBalances.objects.filter(group_id=group_id),
+            self.foreign_key_index(GroupBalances, "group_id"),
+        )
+
+
+class AsyncReadViewTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.token = str(AccessToken.for_user(self.user))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        self.group, (self.owner, *_) = self.make_group(3)
+        url = reverse("expenses:expense-list-create", kwargs={"pk": self.group.id})
+        data = {"title": "Dinner", "paid_by": str(self.owner.id), "amount": 90}
+        self.client.post(url, data, format="json")
+
+    def call(self, view, method="GET", data=None, token=None, **params):
+        request = self.factory.generic(
+            method,
+            "/",
+            json.dumps(data) if data is not None else "",
+            content_type="application/json",
+            QUERY_STRING="&".join(f"{k}={v}" for k, v in params.items()),
+            headers={"Authorization": f"Bearer {token or self.token}"},
+        )
+        response = async_to_sync(view.as_view())(request, pk=self.group.id)
+        if hasattr(response, "render"):
+            # DRF responses from the fallback view are rendered by the handler
+            response.render()
+        return response
+
+    def test_reads_match_the_drf_views(self):
+        for view, name in [
+            (AsyncExpensesView, "expense-list-create"),
+            (AsyncGroupBalanceView, "balances"),
+            (AsyncSuggestedSettlementsView, "suggested-settlements"),
+        ]:
+            url = reverse(f"expenses:{name}", kwargs={"pk": self.group.id})
+            response = self.call(view)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            # answered natively, not by the DRF view in a thread
+            self.assertNotIn("Allow", response)
+            self.assertEqual(json.loads(response.content), self.client.get(url).json())
+        response = self.call(AsyncSuggestedSettlementsView, mode="optimal")
+        self.assertEqual(response["X-Settlement-Algorithm"], "optimal")
+
+    def test_writes_and_rejections_fall_back_to_drf(self):
+        data = {"title": "Taxi", "paid_by": str(self.owner.id), "amount": 30}
+        response = self.call(AsyncExpensesView, "POST", data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Expenses.objects.filter(group_id=self.group).count(), 2)
+
+        # the first page is served natively and links to DRF's next page
+        response = self.call(AsyncExpensesView, page_size=1)
+        self.assertNotIn("Allow", response)
+        page = json.loads(response.content)
+        self.assertEqual([e["title"] for e in page["results"]], ["Taxi"])
+        url = reverse("expenses:expense-list-create", kwargs={"pk": self.group.id})
+        drf_page = self.client.get(url, {"page_size": 1}).json()
+        cursor = parse_qs(urlparse(page["next"]).query)["cursor"][0]
+        self.assertEqual(
+            cursor, parse_qs(urlparse(drf_page["next"]).query)["cursor"][0]
+        )
+        response = self.call(AsyncExpensesView, cursor=quote(cursor), page_size=1)
+        self.assertIn("Allow", response)
+        page = json.loads(response.content)
+        self.assertEqual([e["title"] for e in page["results"]], ["Dinner"])
+        response = self.call(AsyncSuggestedSettlementsView, mode="fastest")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        outsider = CustomUser.objects.create_user(
+            username="out@example.com", email="out@example.com", name="Out"
+        )
+        token = str(AccessToken.for_user(outsider))
+        response = self.call(AsyncGroupBalanceView, token=token)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.call(AsyncGroupBalanceView, token="invalid")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class LedgerExportTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.group, (self.owner, self.friend) = self.make_group(2)
+        self.friend.name = "Friend"
+        self.friend.save()
+        url = reverse("expenses:expense-list-create", kwargs={"pk": self.group.id})
+        self.client.post(
+            url,
+            {"title": "Dinner", "paid_by": str(self.owner.id), "amount": 90},
+            format="json",
+        )
+        participants = [
+            {"member_id": str(self.owner.id), "paid_amt": "12.50"},
+            {"member_id": str(self.friend.id), "paid_amt": 0},
+        ]
+        self.client.post(
+            url,
+            {
+                "title": "Taxi",
+                "paid_by": str(self.owner.id),
+                "participants": participants,
+            },
+            format="json",
+        )
+        self.client.post(
+            reverse("expenses:record-payment", kwargs={"pk": self.group.id}),
+            {
+                "debtor": str(self.friend.id),
+                "creditor": str(self.owner.id),
+                "payment": "6.25",
+            },
+            format="json",
+        )
+
+    def export(self, file_format):
+        url = reverse(
+            "expenses:ledger-export",
+            kwargs={"pk": self.group.id, "file_format": file_format},
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_csv_has_a_row_per_participant_and_payment(self):
+        response, content = self.export("csv")
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(
+            [(r["record"], r["title"]) for r in rows],
+            [
+                ("expense", "Dinner"),
+                ("expense", "Taxi"),
+                ("expense", "Taxi"),
+                ("payment", ""),
+            ],
+        )
+        self.assertEqual(rows[0]["amount"], "90.00")
+        self.assertEqual(rows[0]["participant"], "")
+        paid = {r["participant_name"]: r["participant_paid"] for r in rows[1:3]}
+        self.assertEqual(paid, {"Owner": "12.50", "Friend": "0.00"})
+        payment = rows[3]
+        self.assertEqual(
+            (payment["debtor_name"], payment["creditor_name"], payment["amount"]),
+            ("Friend", "Owner", "6.25"),
+        )
+
+    def test_jsonl_matches_csv(self):
+        _, csv_content = self.export("csv")
+        response, content = self.export("jsonl")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        records = [json.loads(line) for line in content.splitlines()]
+        rows = csv.DictReader(StringIO(csv_content))
+        for record, row in zip(records, rows, strict=True):
+            # JSON lines leave out the fields a record has no value for
+            self.assertEqual(
+                {k: v for k, v in record.items() if v != ""},
+                {k: v for k, v in row.items() if v != ""},
+            )
+
+    def test_csv_cells_never_start_a_formula(self):
+        self.friend.name = "@SUM(A1:A9)"
+        self.friend.save()
+        Expenses.objects.filter(title="Dinner").update(
+            title='=HYPERLINK("http://x.example")', description="+1 for pizza"
+        )
+        _, content = self.export("csv")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual(rows[0]["title"], '\'=HYPERLINK("http://x.example")')
+        self.assertEqual(rows[0]["description"], "'+1 for pizza")
+        self.assertEqual(rows[3]["debtor_name"], "'@SUM(A1:A9)")
+        # amounts are numbers, a minus sign stays as it is
+        self.assertEqual(rows[0]["amount"], "90.00")
+
+        _, content = self.export("jsonl")
+        record = json.loads(content.splitlines()[0])
+        self.assertEqual(record["title"], '=HYPERLINK("http://x.example")')
+
+    def test_query_count_does_not_depend_on_size(self):
+        url = reverse(
+            "expenses:ledger-export", kwargs={"pk": self.group.id, "file_format": "csv"}
+        )
+        # 1 for the group context, 1 for the expenses, 1 for the payments
+        with self.assertNumQueries(3):
+            b"".join(self.client.get(url).streaming_content)
+
+    def test_unknown_format_and_outsiders_are_refused(self):
+        url = reverse(
+            "expenses:ledger-export", kwargs={"pk": self.group.id, "file_format": "xls"}
+        )
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        outsider = CustomUser.objects.create_user(
+            username="out@example.com", email="out@example.com", name="Out"
+        )
+        self.client.force_authenticate(outsider)
+        self.assertEqual(
+            self.client.get(
+                reverse(
+                    "expenses:ledger-export",
+                    kwargs={"pk": self.group.id, "file_format": "csv"},
+                )
+            ).status_code,
+            status.HTTP_403_FORBIDDEN,
+        )
+
+    def test_asgi_streams_through_an_async_iterator(self):
+        request = AsyncRequestFactory().get("/")
+        force_authenticate(request, self.user)
+        response = GroupLedgerExportView.as_view()(
+            request, pk=self.group.id, file_format="csv"
+        )
+
+        async def read():
+            return b"".join([chunk async for chunk in response])
+
+        self.assertEqual(async_to_sync(read)().decode(), self.export("csv")[1])
+
+
+class ExpenseImportTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, group, name, content):
+        url = reverse("expenses:expense-import", kwargs={"pk": group.id})
+        file = SimpleUploadedFile(name, content.encode())
+        return self.client.post(url, {"file": file})
+
+    def balances(self, group, members):
+        rows = dict(
+            GroupBalances.objects.filter(group_id=group).values_list(
+                "member_id", "balance"
+            )
+        )
+        return [rows.get(m.id) for m in members]
+
+    def test_import_posts_the_same_ledger_as_the_api(self):
+        group, members = self.make_group(name="imported")
+        owner, first, second = members
+        content = (
+            "title,amount,paid_by,description,participant,participant_paid\n"
+            f"Rent,900,{owner.email},June,,\n"
+            f"Taxi,,{first.id},,{owner.id},12.50\n"
+            f"Taxi,,{first.id},,M0@example.com,7.50\n"
+            f"Dinner,45.10,{second.email},,,\n"
+        )
+        response = self.upload(group, "ledger.csv", content)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual((response.data["imported"], response.data["rows"]), (3, 4))
+        self.assertIn("rows_per_second", response.data)
+
+        # the same rows as posting each expense through the API would write
+        totals = {}
+        for expense in Expenses.objects.filter(group_id=group):
+            balances = ledger.compute_expense_balances(expense)
+            self.assertEqual(ledger.get_expense_balances(expense), balances)
+            self.assertEqual(
+                TransactionRecords.objects.filter(expense_id=expense).count(),
+                len(suggest_settlements(balances)),
+            )
+            for member, balance in balances.items():
+                totals[member] = totals.get(member, 0) + balance
+        self.assertEqual(self.balances(group, members), [totals[m.id] for m in members])
+        taxi = Expenses.objects.get(group_id=group, title="Taxi")
+        self.assertEqual((taxi.amount, taxi.added_by), (2000, self.user))
+
+    def test_invalid_rows_are_reported_and_nothing_is_imported(self):
+        group, (owner, *_) = self.make_group()
+        self.upload(
+            group,
+            "first.jsonl",
+            json.dumps({"title": "Rent", "amount": 5, "paid_by": str(owner.id)}),
+        )
+        content = "\n".join(
+            [
+                json.dumps({"title": "Food", "amount": 20, "paid_by": owner.email}),
+                json.dumps({"title": "Rent", "amount": 10, "paid_by": owner.email}),
+                "{not json",
+                json.dumps({"title": "Gas", "amount": -3, "paid_by": "x@example.com"}),
+            ]
+        )
+        response = self.upload(group, "more.jsonl", content)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["imported"], 0)
+        self.assertEqual(
+            [(e["line"], len(e["errors"])) for e in response.data["errors"]],
+            [(2, 1), (3, 4), (4, 2)],
+        )
+        self.assertEqual(Expenses.objects.filter(group_id=group).count(), 1)
+
+        response = self.upload(group, "ledger.xlsx", "")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", response.data)
+
+    def test_query_count_does_not_depend_on_size(self):
+        group, (owner, first, _) = self.make_group()
+
+        def content(start, count):
+            return "".join(
+                json.dumps(
+                    {
+                        "title": f"Expense {i}",
+                        "paid_by": owner.email,
+                        "participants": [
+                            {"member_id": owner.email, "paid_amt": 10},
+                            {"member_id": first.email, "paid_amt": 5},
+                        ],
+                    }
+                )
+                + "\n"
+                for i in range(start, start + count)
+            )
+
+        with CaptureQueriesContext(connection) as small:
+            self.upload(group, "small.jsonl", content(0, 2))
+        with CaptureQueriesContext(connection) as large:
+            response = self.upload(group, "large.jsonl", content(2, 50))
+        self.assertEqual(response.data["imported"], 50)
+        self.assertEqual(len(small), len(large))
+
+
+class ExpenseBatchCreateTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        self.group, self.members = self.make_group(3)
+        self.url = reverse("expenses:expense-list-create", kwargs={"pk": self.group.id})
+
+    def post(self, data):
+        return self.client.post(self.url, data, format="json")
+
+    def test_batch_posts_the_same_ledger_as_single_posts(self):
+        owner, first, second = self.members
+        batch = [
+            {"title": "Rent", "paid_by": str(owner.id), "amount": "900"},
+            {
+                "title": "Taxi",
+                "paid_by": str(first.id),
+                "participants": [
+                    {"member_id": str(owner.id), "paid_amt": "12.50"},
+                    {"member_id": str(second.id), "paid_amt": "7.50"},
+                ],
+            },
+            {"title": "Dinner", "paid_by": str(second.id), "amount": "45.10"},
+        ]
+        version = self.group.ledger_version
+        response = self.post(batch)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(
+            [e["title"] for e in response.data], ["Rent", "Taxi", "Dinner"]
+        )
+        self.assertEqual(response.data[1]["amount"], Decimal("20"))
+
+        totals = {}
+        for expense in Expenses.objects.filter(group_id=self.group):
+            balances = ledger.compute_expense_balances(expense)
+            self.assertEqual(ledger.get_expense_balances(expense), balances)
+            self.assertEqual(
+                TransactionRecords.objects.filter(expense_id=expense).count(),
+                len(suggest_settlements(balances)),
+            )
+            for member, balance in balances.items():
+                totals[member] = totals.get(member, 0) + balance
+        balances = dict(
+            GroupBalances.objects.filter(group_id=self.group).values_list(
+                "member_id", "balance"
+            )
+        )
+        self.assertEqual(balances, totals)
+        # a single balance update for the whole batch
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.ledger_version, version + 1)
+
+    def test_invalid_batch_writes_nothing(self):
+        owner = self.members[0]
+        Expenses.objects.create(
+            group_id=self.group, title="Rent", paid_by=owner, amount=100
+        )
+        for batch in (
+            [
+                {"title": "Taxi", "paid_by": str(owner.id), "amount": "5"},
+                {"title": "Taxi", "paid_by": str(owner.id), "amount": "5"},
+            ],
+            [
+                {"title": "Taxi", "paid_by": str(owner.id), "amount": "5"},
+                {"title": "Rent", "paid_by": str(owner.id), "amount": "5"},
+            ],
+            [
+                {"title": "Taxi", "paid_by": str(owner.id), "amount": "5"},
+                {"title": "Dinner", "paid_by": str(owner.id), "amount": "-5"},
+            ],
+            [],
+        ):
+            response = self.post(batch)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Expenses.objects.filter(group_id=self.group).count(), 1)
+        self.assertFalse(GroupBalances.objects.filter(group_id=self.group).exists())
+
+    @override_settings(EXPENSE_BATCH_MAX_SIZE=2)
+    def test_batch_size_is_limited(self):
+        batch = [
+            {"title": f"Expense {i}", "paid_by": str(self.members[0].id), "amount": 1}
+            for i in range(3)
+        ]
+        response = self.post(batch)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Expenses.objects.filter(group_id=self.group).exists())
+
+    def test_batch_writes_take_a_fixed_number_of_queries(self):
+        def batch(start, count):
+            participants = [
+                {"member_id": str(m.id), "paid_amt": 1} for m in self.members
+            ]
+            return [
+                {
+                    "title": f"Expense {i}",
+                    "paid_by": str(self.members[0].id),
+                    "amount": 3,
+                    # every other expense is split equally
+                    **({"participants": participants} if i % 2 else {}),
+                }
+                for i in range(start, start + count)
+            ]
+
+        with CaptureQueriesContext(connection) as small:
+            self.post(batch(0, 2))
+        with CaptureQueriesContext(connection) as large:
+            response = self.post(batch(2, 20))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(small), len(large))
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    # not TestCase: the command must leave the caller's connection usable
+    # outside of a test transaction too
+    def test_seeds_and_drives_every_operation(self):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            groups=1,
+            members=3,
+            expenses=2,
+            payments=1,
+            clients=1,
+            duration=0.5,
+            in_place=True,
+            stdout=out,
+        )
+        self.assertGreaterEqual(
+            Expenses.objects.filter(title__startswith="Load test").count(), 2
+        )
+        report = out.getvalue().splitlines()
+        rows = {line.split()[0]: line.split() for line in report[3:]}
+        for name in [
+            "expenses",
+            "add-expense",
+            "balances",
+            "settlements",
+            "record-payment",
+            "all",
+        ]:
+            self.assertIn(name, rows)
+            self.assertEqual(rows[name][-1], "0")  # no errors
+
+
+class SettlementBenchCommandTests(SimpleTestCase):
+    def test_reports_every_function_and_size(self):
+        out = StringIO()
+        call_command("settlementbench", sizes="5,50", repeat=1, stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines()[1:]]
+        self.assertEqual(
+            [(size, name) for size, name, *_ in rows],
+            [
+                ("5", "split"),
+                ("5", "greedy"),
+                ("5", "optimal"),
+                ("50", "split"),
+                ("50", "greedy"),
+            ],
+        )
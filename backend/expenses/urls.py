@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 
 from .views import (
@@ -8,13 +9,33 @@ from .views import (
     SuggestedSettlementsView,
     TransactionRecordsView,
     GroupTransactionHistoryView,
+    GroupLedgerExportView,
+    ExpenseImportView,
 )
+from .async_views import (
+    AsyncExpensesView,
+    AsyncGroupBalanceView,
+    AsyncSuggestedSettlementsView,
+)
+
+if settings.ASYNC_READ_VIEWS:
+    # serve the hot reads with the async ORM, writes still go to the DRF views
+    ExpensesView, GroupBalanceView, SuggestedSettlementsView = (
+        AsyncExpensesView,
+        AsyncGroupBalanceView,
+        AsyncSuggestedSettlementsView,
+    )
 
 app_name = "expenses"
 urlpatterns = [
     path(
         "groups/<uuid:pk>/expenses/", ExpensesView.as_view(), name="expense-list-create"
     ),
+    path(
+        "groups/<uuid:pk>/expenses/import/",
+        ExpenseImportView.as_view(),
+        name="expense-import",
+    ),
     path(
         "groups/<uuid:pk>/expenses/<uuid:id>/",
         ExpenseDetailView.as_view(),
@@ -41,4 +62,9 @@ urlpatterns = [
         GroupTransactionHistoryView.as_view(),
         name="group-transaction-history",
     ),
+    path(
+        "groups/<uuid:pk>/ledger.<str:file_format>",
+        GroupLedgerExportView.as_view(),
+        name="ledger-export",
+    ),
 ]
@@ -1,10 +1,16 @@
 from rest_framework.views import APIView
-from rest_framework import generics, mixins
+from rest_framework import generics, mixins, serializers
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
+from django.db.models import F
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from groups.models import Groups, Membership
 
@@ -18,60 +24,32 @@ from .models import (
 from .serializers import (
     ExpensesSerializer,
     ExpensesDetailSerializer,
-    ExpenseBalanceSerializer,
     TransactionRecordsSerializer,
     GroupBalancesSerializer,
     RecordPaymentSerializer,
+    SettlementSerializer,
+)
+from .export import EXPORT_FORMATS, batched, iterate_in_thread, ledger_rows
+from .pagination import CreatedAtCursorPagination
+from .settlement import SETTLEMENT_SOLVERS, run_settlement
+from . import importer, ledger
+
+from groups.permissions import (
+    IsGroupMember,
+    IsGroupAdmin,
+    IsSelfOrAdmin,
+    get_group_or_404,
 )
-
-from groups.permissions import IsGroupMember, IsGroupAdmin, IsSelfOrAdmin
 
 
-def min_cash_flow(balances):
+def with_expense_details(qs):
     """
-    Function takes balance dictionary and returns transactions list
-
-    balance -> +ve means , others have to pay back to him
-    balance -> -ve means , he has to pay others to him
-    balance -> 0 means already settled
+    Loads what ExpensesDetailSerializer renders in a fixed number of queries:
+    the adder's name is annotated and participants are prefetched in one go.
     """
-
-    transactions = []
-    # seperate the balances dict to creditors and debtors  and get list using list comprehension
-    creditors = [(m, bal) for m, bal in balances.items() if bal > 0]
-    debtors = [(m, -bal) for m, bal in balances.items() if bal < 0]
-
-    # sort creditors and debtors in descending orders
-    creditors.sort(key=lambda x: -x[1])  # -ve is for sorting in descending order
-    debtors.sort(key=lambda x: -x[1])
-
-    while creditors and debtors:
-        # retrieve highest creditor and debitor
-        creditor, credit_amt = creditors[0]
-        debtor, debit_amt = debtors[0]
-
-        # get minimum amount among credit and debit
-        payment = min(credit_amt, debit_amt)
-        # append to transactions list
-        transactions.append(
-            {"debtor": debtor, "creditor": creditor, "payment": payment}
-        )
-
-        # remove first tuples, update payment and reinsert if amt !=0 and sort lists again
-        creditors = creditors[1:]
-        debtors = debtors[1:]
-
-        credit_amt -= payment
-        debit_amt -= payment
-
-        if credit_amt > 0:
-            creditors.append((creditor, credit_amt))
-            creditors.sort(key=lambda x: x[-1])
-
-        if debit_amt > 0:
-            debtors.append((debtor, debit_amt))
-            debtors.sort(key=lambda x: x[-1])
-    return transactions
+    return qs.annotate(added_by_name=F("added_by__name")).prefetch_related(
+        "expensesparticipants_set"
+    )
 
 
 class ExpensesView(
@@ -80,12 +58,30 @@ class ExpensesView(
     queryset = Expenses.objects.all()
     serializer_class = ExpensesSerializer
     permission_classes = [IsAuthenticated, IsGroupMember]
+    pagination_class = CreatedAtCursorPagination
+
+    def get_serializer_class(self):
+        if self.request.method == "GET":
+            return ExpensesDetailSerializer
+        return super().get_serializer_class()
 
     def get_queryset(self):
         group_id = self.kwargs.get("pk")
         qs = super().get_queryset()
+        if self.request.method == "GET":
+            qs = with_expense_details(qs)
         return qs.filter(group_id=group_id)
 
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == "POST" and isinstance(kwargs.get("data"), list):
+            # a batch of expenses, see ExpensesListSerializer
+            kwargs.update(
+                many=True,
+                allow_empty=False,
+                max_length=settings.EXPENSE_BATCH_MAX_SIZE,
+            )
+        return super().get_serializer(*args, **kwargs)
+
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
 
@@ -94,45 +90,15 @@ class ExpensesView(
 
     @transaction.atomic
     def perform_create(self, serializer):
+        if isinstance(serializer, serializers.ListSerializer):
+            # one group balance update (and ledger version) for the whole batch
+            expenses = serializer.save()
+            ledger.post_expenses(
+                self.kwargs["pk"], ledger.compute_expenses_balances(expenses)
+            )
+            return
         expense_instance = serializer.save()
-        balances = {}
-        group = expense_instance.group_id
-        participants = expense_instance.expensesparticipants_set.all()
-        # split equally and all
-        if not participants:
-            members = group.membership_set.all()
-            share = expense_instance.amount / members.count()
-            for m in members:
-                balances[m.id] = -share
-            balances[expense_instance.paid_by.id] += expense_instance.amount
-        # split between participants equally;
-        else:
-            share = expense_instance.amount / participants.count()
-            for p in participants:
-                balances[p.member_id.id] = p.paid_amt - share
-
-        # record Expense Balances
-        for m, bal in balances.items():
-            data = {"expense_id": expense_instance.id, "member_id": m, "balance": bal}
-            expense_balance_serializer = ExpenseBalanceSerializer(data=data)
-            if expense_balance_serializer.is_valid(raise_exception=True):
-                expense_balance_serializer.save()
-
-        # to record Proposed Settlements
-        transactions = min_cash_flow(balances)
-        for t in transactions:
-            t["expense_id"] = expense_instance.id
-            # t["recorded_by"] = self.request.user.id (no need)
-            settlement_serializer = TransactionRecordsSerializer(data=t)
-            if settlement_serializer.is_valid(raise_exception=True):
-                settlement_serializer.save()
-
-        # to update group balances.
-        for m, bal in balances.items():
-            data = {"group_id": group.id, "member_id": m, "balance": bal}
-            group_balance_serializer = GroupBalancesSerializer(data=data)
-            if group_balance_serializer.is_valid(raise_exception=True):
-                group_balance_serializer.save()
+        ledger.post_expense(expense_instance)
 
 
 class ExpenseDetailView(
@@ -148,6 +114,12 @@ class ExpenseDetailView(
             return ExpensesSerializer
         return super().get_serializer_class()
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.request.method == "GET":
+            qs = with_expense_details(qs)
+        return qs
+
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
@@ -156,87 +128,8 @@ class ExpenseDetailView(
 
     @transaction.atomic
     def perform_update(self, serializer):
-        old_expense_instance = self.get_object()
-        old_balances = self.get_old_balances(old_expense_instance)
-        # reverse the sign of all balance values
-        old_balances = {m_id: -bal for m_id, bal in old_balances.items()}
-
-        # delete old transactions saved.
-        TransactionRecords.objects.filter(expense_id=old_expense_instance.id).delete()
-
         new_instance = serializer.save()
-        new_balances = self.get_balance_dict(new_instance)
-
-        # create new Proposed transactions.
-        transactions = min_cash_flow(new_balances)
-        self.record_proposed_transactions(transactions, new_instance)
-
-        # update Expense Balances
-        self.update_expense_balance(old_expense_instance, new_balances)
-        # update Group Balances;
-        group = old_expense_instance.group_id
-        self.update_group_balances(old_balances, group)
-        self.update_group_balances(new_balances, group)
-
-    def get_old_balances(self, expense_instance):
-        old_balances = ExpenseBalances.objects.filter(expense_id=expense_instance)
-        balance_dict = {obj.member_id.id: obj.balance for obj in old_balances}
-        return balance_dict
-
-    def update_expense_balance(self, expense_instance, new_balances):
-        # delete balance for unsent participants
-        existing_balances = [
-            obj.member_id for obj in expense_instance.expensebalances_set.all()
-        ]
-        new_balances_list = list(new_balances.keys())
-        for m in existing_balances:
-            if m not in new_balances_list:
-                ExpenseBalances.objects.filter(
-                    expense_id=expense_instance, member_id=m
-                ).delete()
-
-        for m, bal in new_balances.items():
-            data = {"expense_id": expense_instance.id, "member_id": m, "balance": bal}
-            expense_balance_serializer = ExpenseBalanceSerializer(data=data)
-            if expense_balance_serializer.is_valid(raise_exception=True):
-                expense_balance_serializer.save()
-
-    def record_proposed_transactions(self, transactions, expense_instance):
-        for t in transactions:
-            t["expense_id"] = expense_instance.id
-            # t["recorded_by"] = self.request.user.id (no need)
-            settlement_serializer = TransactionRecordsSerializer(data=t)
-            if settlement_serializer.is_valid(raise_exception=True):
-                settlement_serializer.save()
-
-    def get_balance_dict(self, expense_instance):
-        balances = {}
-        group = expense_instance.group_id
-        participants = expense_instance.expensesparticipants_set.all()
-        # split equally and all
-        if not participants:
-            members = group.membership_set.all()
-            share = expense_instance.amount / members.count()
-            for m in members:
-                balances[m.id] = -share
-            balances[expense_instance.paid_by.id] += expense_instance.amount
-        # split between participants equally;
-        else:
-            share = expense_instance.amount / participants.count()
-            for p in participants:
-                balances[p.member_id.id] = p.paid_amt - share
-        return balances
-
-    def update_group_balances(self, balances, group):
-        for m, bal in balances.items():
-            data = {
-                "group_id": group.id,
-                "member_id": m,
-                "balance": bal,
-            }
-            group_balance_serializer = GroupBalancesSerializer(data=data)
-            if group_balance_serializer.is_valid(raise_exception=True):
-                group_balance_serializer.save()
+        ledger.repost_expense(new_instance)
 
 
 class GroupBalanceView(generics.GenericAPIView, mixins.ListModelMixin):
@@ -246,15 +139,7 @@ class GroupBalanceView(generics.GenericAPIView, mixins.ListModelMixin):
     serializer_class = GroupBalancesSerializer
 
     def get(self, request, *args, **kwargs):
-        response = self.list(request, *args, **kwargs)
-        if response.status_code == 200:
-            # balance is converted to string due to frontend issue
-            balance_list = [
-                {**b, "balance": str(b.get("balance"))} for b in response.data
-            ]
-
-            return Response(balance_list, status=status.HTTP_200_OK)
-        return response
+        return self.list(request, *args, **kwargs)
 
     def get_queryset(self):
         gid = self.kwargs.get("pk")
@@ -263,15 +148,50 @@ class GroupBalanceView(generics.GenericAPIView, mixins.ListModelMixin):
 
 
 class SuggestedSettlementsView(APIView):
+    """
+    ?mode=greedy|optimal picks the settlement algorithm (default
+    settings.SETTLEMENT_SOLVER). The algorithm that produced the answer is
+    reported in the X-Settlement-Algorithm header, and its run time in
+    X-Settlement-Time-Ms when this request solved it (X-Settlement-Cache: hit
+    otherwise).
+    """
+
     permission_classes = [IsAuthenticated, IsGroupMember]
 
     def get(self, request, *args, **kwargs):
         group_id = kwargs.get("pk")
-        get_object_or_404(Groups, id=group_id)
-        balance_qs = GroupBalances.objects.filter(group_id=group_id)
-        balances = {obj.member_id.id: obj.balance for obj in balance_qs}
-        settlements = min_cash_flow(balances)
-        return Response(settlements, status=status.HTTP_200_OK)
+        mode = request.query_params.get("mode", settings.SETTLEMENT_SOLVER)
+        if mode not in SETTLEMENT_SOLVERS:
+            raise ValidationError(
+                {"mode": f"Must be one of: {', '.join(SETTLEMENT_SOLVERS)}."}
+            )
+        group = get_group_or_404(request, self)
+        # settlements only change when the ledger does, so cache them per version
+        cache_key = ledger.settlements_cache_key(group.id, group.ledger_version, mode)
+        cached = cache.get(cache_key)
+        elapsed_ms = None  # only reported when solved by this request
+        if cached is None:
+            balances = dict(
+                GroupBalances.objects.filter(group_id=group_id).values_list(
+                    "member_id", "balance"
+                )
+            )
+            result = run_settlement(balances, mode)
+            elapsed_ms = result.elapsed_ms
+            cached = {
+                "algorithm": result.algorithm,
+                "settlements": SettlementSerializer(
+                    result.transactions, many=True
+                ).data,
+            }
+            cache.set(cache_key, cached, settings.SETTLEMENTS_CACHE_TIMEOUT)
+        response = Response(cached["settlements"], status=status.HTTP_200_OK)
+        response["X-Settlement-Algorithm"] = cached["algorithm"]
+        if elapsed_ms is None:
+            response["X-Settlement-Cache"] = "hit"
+        else:
+            response["X-Settlement-Time-Ms"] = f"{elapsed_ms:.3f}"
+        return response
 
 
 class RecordPaymentView(APIView):
@@ -280,7 +200,7 @@ class RecordPaymentView(APIView):
     @transaction.atomic
     def post(self, request, *args, **kwargs):
         usr = request.user
-        group = get_object_or_404(Groups, id=kwargs.get("pk"))
+        group = get_group_or_404(request, self)
         serializer = RecordPaymentSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         payer = serializer.data.get("debtor")
@@ -298,21 +218,12 @@ class RecordPaymentView(APIView):
         }
         transaction_serializer = TransactionRecordsSerializer(data=t)
         transaction_serializer.is_valid(raise_exception=True)
-        transaction_serializer.save()
-
-        # update group balance table
-        record_list = [
-            {"group_id": group.id, "member_id": payer, "balance": payment},
-            {
-                "group_id": group.id,
-                "member_id": receiver,
-                "balance": -payment,
-            },
-        ]
-        for r in record_list:
-            balance_serializer = GroupBalancesSerializer(data=r)
-            balance_serializer.is_valid(raise_exception=True)
-            balance_serializer.save()
+        record = transaction_serializer.save()
+
+        # update group balance table (in minor units)
+        ledger.apply_group_balance_deltas(
+            group.id, {payer: record.payment, receiver: -record.payment}
+        )
 
         return Response(
             {"detail": "Payment Recorded Successfully"},
@@ -322,6 +233,7 @@ class RecordPaymentView(APIView):
 
 class TransactionRecordsView(generics.GenericAPIView, mixins.ListModelMixin):
     permission_classes = [IsAuthenticated, IsGroupMember]
+    pagination_class = CreatedAtCursorPagination
 
     queryset = TransactionRecords.objects.all()
     serializer_class = TransactionRecordsSerializer
@@ -338,6 +250,7 @@ class TransactionRecordsView(generics.GenericAPIView, mixins.ListModelMixin):
 
 class GroupTransactionHistoryView(generics.GenericAPIView, mixins.ListModelMixin):
     permission_classes = [IsAuthenticated, IsGroupMember]
+    pagination_class = CreatedAtCursorPagination
 
     queryset = TransactionRecords.objects.all()
     serializer_class = TransactionRecordsSerializer
@@ -350,3 +263,57 @@ class GroupTransactionHistoryView(generics.GenericAPIView, mixins.ListModelMixin
 
     def get(self, request, *args, **kwargs):
         return self.list(request, *args, **kwargs)
+
+
+class GroupLedgerExportView(APIView):
+    """
+    Streams the whole ledger of the group, expenses with their participants
+    and recorded payments, as groups/<id>/ledger.csv or ledger.jsonl (see
+    expenses.export for the columns).
+    """
+
+    permission_classes = [IsAuthenticated, IsGroupMember]
+
+    def get(self, request, *args, **kwargs):
+        if kwargs["file_format"] not in EXPORT_FORMATS:
+            raise Http404
+        lines, content_type = EXPORT_FORMATS[kwargs["file_format"]]
+        group = get_group_or_404(request, self)
+        chunks = batched(lines(ledger_rows(group.id)))
+        if isinstance(request._request, ASGIRequest):
+            chunks = iterate_in_thread(chunks)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        response["Content-Disposition"] = (
+            f'attachment; filename="ledger-{group.id}.{kwargs["file_format"]}"'
+        )
+        return response
+
+
+class ExpenseImportView(APIView):
+    """
+    Imports expenses in bulk from an uploaded CSV or JSON lines `file` (see
+    expenses.importer for the layout). Nothing is imported unless every
+    expense is valid; the answer lists the errors of each invalid one, with
+    its line in the file.
+    """
+
+    permission_classes = [IsAuthenticated, IsGroupMember]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, *args, **kwargs):
+        group = get_group_or_404(request, self)
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": "No file was submitted."})
+        try:
+            report = importer.import_expenses(group, request.user, upload)
+        except importer.ImportFileError as e:
+            raise ValidationError({"file": str(e)})
+        return Response(
+            report,
+            status=(
+                status.HTTP_400_BAD_REQUEST
+                if "errors" in report
+                else status.HTTP_201_CREATED
+            ),
+        )
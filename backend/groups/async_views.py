@@ -0,0 +1,20 @@
+"""
+Async version of the group list, served when ASYNC_READ_VIEWS is on.
+Creating a group still goes through the DRF view.
+"""
+
+from core.async_views import AsyncReadView, render_json
+
+from .models import Groups
+from .serializers import GroupsSerializer
+from .views import GroupListCreateView
+
+
+class AsyncGroupListCreateView(AsyncReadView):
+    fallback_view = GroupListCreateView
+
+    async def get(self, request, *args, **kwargs):
+        qs = Groups.objects.filter(membership__user_id=request.user)
+        groups = [group async for group in qs]
+        serializer = GroupsSerializer(groups, many=True, context={"request": request})
+        return render_json(serializer.data)
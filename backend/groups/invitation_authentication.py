@@ -1,8 +1,9 @@
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from users.authentication import CachedJWTAuthentication
 
-class InvitationAuthentication(JWTAuthentication):
+
+class InvitationAuthentication(CachedJWTAuthentication):
     """
     Custom JWT authentication that doesn't fail on invalid or missing tokens.
     Returns None instead of raising exceptions, allowing the view to handle
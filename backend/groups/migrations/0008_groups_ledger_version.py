@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("groups", "0007_alter_invitation_invited_by"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="groups",
+            name="ledger_version",
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_into(apps, keep, others):
+    # move everything the duplicates took part in over to the kept membership
+    ids = [m.id for m in others]
+    Expenses = apps.get_model("expenses", "Expenses")
+    TransactionRecords = apps.get_model("expenses", "TransactionRecords")
+    Expenses.objects.filter(paid_by__in=ids).update(paid_by=keep)
+    TransactionRecords.objects.filter(debtor__in=ids).update(debtor=keep)
+    TransactionRecords.objects.filter(creditor__in=ids).update(creditor=keep)
+    TransactionRecords.objects.filter(debtor=keep, creditor=keep).delete()
+
+    # rows per expense (or group) and member are summed into one, except
+    # repeated ExpenseBalances rows of a member, which hold the same value
+    for model, parent, amount, copies in [
+        ("ExpensesParticipants", "expense_id", "paid_amt", False),
+        ("ExpenseBalances", "expense_id", "balance", True),
+        ("GroupBalances", "group_id", "balance", False),
+    ]:
+        Model = apps.get_model("expenses", model)
+        parent = Model._meta.get_field(parent).attname
+        merged, seen, extra = {}, set(), []
+        for row in Model.objects.filter(member_id__in=[keep.id, *ids]):
+            key = getattr(row, parent)
+            copy = (key, row.member_id_id) in seen
+            seen.add((key, row.member_id_id))
+            if key not in merged:
+                merged[key] = row
+                row.member_id_id = keep.id
+                continue
+            if not (copies and copy):
+                total = getattr(merged[key], amount) + getattr(row, amount)
+                setattr(merged[key], amount, total)
+            extra.append(row.id)
+        Model.objects.filter(id__in=extra).delete()
+        Model.objects.bulk_update(merged.values(), ["member_id", amount])
+
+    keep.user_id_id = keep.user_id_id or next(
+        (m.user_id_id for m in others if m.user_id_id), None
+    )
+    keep.name = keep.name or next((m.name for m in others if m.name), None)
+    keep.verified = keep.verified or any(m.verified for m in others)
+    Membership = apps.get_model("groups", "Membership")
+    Membership.objects.filter(id__in=ids).delete()
+    keep.save()
+
+
+def merge_duplicate_memberships(apps, schema_editor):
+    # the invite flow never prevented repeated memberships: fold them into one
+    # (preferring the one linked to a user) before adding the constraints
+    Membership = apps.get_model("groups", "Membership")
+    for field in ("user_id", "email"):
+        duplicates = list(
+            Membership.objects.exclude(**{f"{field}__isnull": True})
+            .values("group_id", field)
+            .annotate(rows=Count("id"))
+            .filter(rows__gt=1)
+        )
+        for dup in duplicates:
+            rows = sorted(
+                Membership.objects.filter(
+                    group_id=dup["group_id"], **{field: dup[field]}
+                ),
+                key=lambda m: (m.user_id_id is None, not m.verified),
+            )
+            merge_into(apps, rows[0], rows[1:])
+    if schema_editor.connection.vendor == "postgresql":
+        # run the deferred foreign key checks now, the constraints below are
+        # an ALTER TABLE, refused while trigger events are pending
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("groups", "0008_groups_ledger_version"),
+        ("expenses", "0018_pagination_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_memberships, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="invitation",
+            index=models.Index(
+                fields=["invited_email", "status"], name="invitation_email_status_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="membership",
+            constraint=models.UniqueConstraint(
+                fields=("group_id", "user_id"), name="unique_group_member_user"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="membership",
+            constraint=models.UniqueConstraint(
+                fields=("group_id", "email"), name="unique_group_member_email"
+            ),
+        ),
+    ]
@@ -11,6 +11,8 @@ class Groups(models.Model):
         CustomUser, on_delete=models.CASCADE, related_name="expense_groups"
     )  # here admin should be transfered if admin is deleted??? for now group is deleted if admin is deleted.
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped on every balance write, used to key cached settlements (expenses.ledger)
+    ledger_version = models.PositiveBigIntegerField(default=0)
 
     def __str__(self):
         return self.name
@@ -26,6 +28,18 @@ class Membership(models.Model):
     )  # if verified user is deleted (set user deleted) then memeber is also delete (fix this if you require : this is remainder only)
     verified = models.BooleanField(default=False)
 
+    class Meta:
+        constraints = [
+            # (group_id, user_id) backs the IsGroupMember lookup; NULL user_ids
+            # (not yet verified members) never conflict with each other
+            models.UniqueConstraint(
+                fields=["group_id", "user_id"], name="unique_group_member_user"
+            ),
+            models.UniqueConstraint(
+                fields=["group_id", "email"], name="unique_group_member_email"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.email}|G={self.group_id.name}"
 
@@ -42,5 +56,13 @@ class Invitation(models.Model):
     status = models.CharField(max_length=1, choices=STATUS, default="P")
     invited_by = models.EmailField()
 
+    class Meta:
+        indexes = [
+            # pending invitations of a user (InvitationsForUserListView)
+            models.Index(
+                fields=["invited_email", "status"], name="invitation_email_status_idx"
+            ),
+        ]
+
     def __str__(self):
         return f"{self.group_id}-{self.invited_email}-{self.status}"
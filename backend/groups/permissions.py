@@ -1,37 +1,99 @@
+from collections import namedtuple
+
 from rest_framework.permissions import (
     BasePermission,
 )
-from django.shortcuts import get_object_or_404
+from django.db.models import OuterRef, Subquery, UUIDField, Value
+from django.http import Http404
 from .models import Groups, Membership
 
+GroupContext = namedtuple("GroupContext", ["group", "membership_id", "is_admin"])
+
+
+def _group_context_queryset(user, group_id):
+    if user.is_authenticated:
+        membership_id = Subquery(
+            Membership.objects.filter(group_id=OuterRef("pk"), user_id=user.id).values(
+                "id"
+            )[:1]
+        )
+    else:
+        # unverified members have no user, never match them to anonymous users
+        membership_id = Value(None, output_field=UUIDField())
+    return Groups.objects.filter(id=group_id).annotate(membership_id=membership_id)
+
+
+def _make_group_context(user, group):
+    return GroupContext(
+        group=group,
+        membership_id=group.membership_id if group else None,
+        is_admin=bool(group and user.is_authenticated and group.admin_id == user.id),
+    )
+
+
+def get_group_context(request, view):
+    """
+    Resolves the group from the url (`pk`), the requesting user's membership
+    in it and whether they are its admin, in a single query.
+
+    The result is stored on the request, so permissions, serializers and
+    views of the same request share it instead of querying again. `group` is
+    None when the group does not exist.
+    """
+    context = getattr(request, "group_context", None)
+    if context is not None:
+        return context
+
+    user = request.user
+    group = _group_context_queryset(user, view.kwargs.get("pk")).first()
+    context = _make_group_context(user, group)
+    request.group_context = context
+    return context
+
+
+async def aget_group_context(request, view):
+    """Async version of get_group_context, for the async views."""
+    context = getattr(request, "group_context", None)
+    if context is not None:
+        return context
+
+    user = request.user
+    group = await _group_context_queryset(user, view.kwargs.get("pk")).afirst()
+    context = _make_group_context(user, group)
+    request.group_context = context
+    return context
+
+
+def get_group_or_404(request, view):
+    group = get_group_context(request, view).group
+    if group is None:
+        raise Http404
+    return group
+
 
 class IsGroupAdmin(BasePermission):
     def has_permission(self, request, view):
-        group_id = view.kwargs.get("pk")
-        group = Groups.objects.filter(id=group_id).first()
-        if not group:
+        context = get_group_context(request, view)
+        if not context.group:
             return True
         # if group doesnot exists, allow permssion and let view handle it
-        return request.user.is_authenticated and group.admin == request.user
+        return request.user.is_authenticated and context.is_admin
 
 
 class IsGroupMember(BasePermission):
     def has_permission(self, request, view):
-        group = Groups.objects.filter(id=view.kwargs.get("pk")).first()
-        if not group:
+        context = get_group_context(request, view)
+        if not context.group:
             return True
-        is_member = Membership.objects.filter(
-            group_id=group.id, user_id=request.user.id
-        ).exists()
+        is_member = context.membership_id is not None
         return request.user.is_authenticated and is_member
 
 
 class IsSelfOrAdmin(BasePermission):
     def has_permission(self, request, view):
-        member = Membership.objects.filter(id=view.kwargs.get("id")).first()
-        if not member:
-            return True
-        group = Groups.objects.filter(id=view.kwargs.get("pk")).first()
-        if not group:
+        context = get_group_context(request, view)
+        if not context.group:
             return True
-        return member.user_id == request.user or group.admin == request.user
+        # the membership in the url is the requester's own, or they run the group
+        is_self = str(view.kwargs.get("id")) == str(context.membership_id)
+        return is_self or context.is_admin
@@ -4,13 +4,14 @@ from django.db import transaction
 
 # models
 from .models import Groups, Membership, Invitation
+from .permissions import get_group_context
 
 
 class GroupsSerializer(serializers.ModelSerializer):
     class Meta:
         model = Groups
         fields = "__all__"
-        read_only_fields = ["created_at"]
+        read_only_fields = ["created_at", "ledger_version"]
         extra_kwargs = {"admin": {"required": False}}
 
     def validate(self, validated_data):
@@ -43,21 +44,38 @@ class MembershipSerializer(serializers.ModelSerializer):
         fields = "__all__"
         read_only_fields = ["group_id"]
 
-    def create(self, validated_data):
-        view = self.context.get("view")
-        group_id = view.kwargs.get("pk")
-        try:
-            group = Groups.objects.get(id=group_id)
-        except Groups.DoesNotExist:
-            raise serializers.ValidationError("Group Id is invalid")
-        validated_data["group_id"] = group
+    def validate(self, attrs):
+        # group_id is read only, so DRF does not derive validators for the
+        # (group_id, email) and (group_id, user_id) unique constraints
+        if self.instance is not None:
+            group = self.instance.group_id_id
+        else:
+            view = self.context.get("view")
+            group = get_group_context(self.context.get("request"), view).group
+        if group is None:
+            return attrs
 
-        email = validated_data.get("email")
-        if Membership.objects.filter(group_id=group, email=email).exists():
+        others = Membership.objects.filter(group_id=group)
+        if self.instance is not None:
+            others = others.exclude(pk=self.instance.pk)
+        email = attrs.get("email")
+        if email is not None and others.filter(email=email).exists():
             raise serializers.ValidationError(
                 "Member with this email already exists in this group"
             )
+        user = attrs.get("user_id")
+        if user is not None and others.filter(user_id=user).exists():
+            raise serializers.ValidationError(
+                "This user is already a member of this group"
+            )
+        return attrs
 
+    def create(self, validated_data):
+        view = self.context.get("view")
+        group = get_group_context(self.context.get("request"), view).group
+        if group is None:
+            raise serializers.ValidationError("Group Id is invalid")
+        validated_data["group_id"] = group
         return super().create(validated_data)
 
 
@@ -1,3 +1,159 @@
-from django.test import TestCase
+import json
+import uuid
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.testing import GroupFixtureMixin, QueryPlanMixin
+from users.models import CustomUser
+
+from .async_views import AsyncGroupListCreateView
+from .models import Invitation, Membership
+
+
+class HotPathIndexTests(QueryPlanMixin, TestCase):
+    """EXPLAIN the lookups done on every group-scoped request."""
+
+    def test_membership_lookups_use_their_index(self):
+        group_id, user_id = uuid.uuid4(), uuid.uuid4()
+        self.assertUsesIndex(
+            Membership.objects.filter(group_id=group_id, user_id=user_id),
+            "unique_group_member_user",
+        )
+        self.assertUsesIndex(
+            Membership.objects.filter(group_id=group_id, email="a@example.com"),
+            "unique_group_member_email",
+        )
+
+    def test_pending_invitations_lookup_uses_its_index(self):
+        self.assertUsesIndex(
+            Invitation.objects.filter(invited_email="a@example.com", status="P"),
+            "invitation_email_status_idx",
+        )
+
+
+class GroupContextTests(GroupFixtureMixin, APITestCase):
+    def setUp(self):
+        super().setUp()
+        # the user administers the group, its second member is unverified and
+        # must never match an anonymous request
+        self.group, _ = self.make_group(2)
+        self.member_user = CustomUser.objects.create_user(
+            username="user@example.com", email="user@example.com", name="User"
+        )
+        self.member = Membership.objects.create(
+            email=self.member_user.email, group_id=self.group, user_id=self.member_user
+        )
+
+    def test_group_detail_authorizes_in_one_query(self):
+        self.client.force_authenticate(self.member_user)
+        url = reverse("groups:group-detail", kwargs={"pk": self.group.id})
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["name"], "household")
+
+    def test_non_members_and_anonymous_users_are_rejected(self):
+        url = reverse("groups:member-list-create", kwargs={"pk": self.group.id})
+        self.assertEqual(self.client.get(url).status_code, 401)
+        outsider = CustomUser.objects.create_user(
+            username="out@example.com", email="out@example.com", name="Out"
+        )
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_members_edit_only_themselves_unless_admin(self):
+        admin_member = Membership.objects.get(user_id=self.user)
+
+        def member_url(member):
+            return reverse(
+                "groups:member-detail", kwargs={"pk": self.group.id, "id": member.id}
+            )
+
+        self.client.force_authenticate(self.member_user)
+        response = self.client.patch(member_url(self.member), {"name": "Me"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(member_url(admin_member), {"name": "Boss"})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(self.user)
+        response = self.client.patch(member_url(self.member), {"name": "Them"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_member_updates_cannot_collide_with_another_member(self):
+        self.client.force_authenticate(self.user)
+        url = reverse(
+            "groups:member-detail", kwargs={"pk": self.group.id, "id": self.member.id}
+        )
+        response = self.client.patch(url, {"email": self.user.email})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(url, {"user_id": str(self.user.id)})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # re-sending the member's own values is not a conflict
+        response = self.client.put(
+            url, {"email": self.member_user.email, "user_id": str(self.member_user.id)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_members_cannot_be_added_twice(self):
+        self.client.force_authenticate(self.user)
+        url = reverse("groups:member-list-create", kwargs={"pk": self.group.id})
+        response = self.client.post(
+            url, {"email": "new@example.com", "user_id": str(self.member_user.id)}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {"email": self.member_user.email})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Membership.objects.filter(group_id=self.group).count(), 3)
+
+    def test_accepting_an_invitation_as_an_existing_member_is_rejected(self):
+        # the user already joined under another address
+        invited = Membership.objects.create(
+            email="user.alias@example.com", group_id=self.group
+        )
+        self.member_user.email = invited.email
+        self.member_user.save()
+        invitation = Invitation.objects.create(
+            invited_email=invited.email,
+            group_id=self.group,
+            token="token",
+            invited_by=self.user.email,
+        )
+        self.client.force_authenticate(self.member_user)
+        response = self.client.post("/api/groups/join/?token=token")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["code"], "ALREADY_MEMBER")
+        invited.refresh_from_db()
+        invitation.refresh_from_db()
+        self.assertIsNone(invited.user_id)
+        self.assertEqual(invitation.status, "P")
+
+
+class AsyncGroupListTests(APITestCase):
+    def test_list_matches_the_drf_view_and_creates_fall_back(self):
+        user = CustomUser.objects.create_user(
+            username="user@example.com", email="user@example.com", name="User"
+        )
+        token = str(AccessToken.for_user(user))
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        factory, headers = AsyncRequestFactory(), {"Authorization": f"Bearer {token}"}
+        view = async_to_sync(AsyncGroupListCreateView.as_view())
+
+        data = {"name": "trip"}
+        response = view(
+            factory.post("/", data, content_type="application/json", headers=headers)
+        )
+        response.render()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = view(factory.get("/", headers=headers))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        groups = json.loads(response.content)
+        self.assertEqual([g["name"] for g in groups], ["trip"])
+        self.assertEqual(
+            groups, self.client.get(reverse("groups:group-list-create")).json()
+        )
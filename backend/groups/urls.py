@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 import uuid
 from .views import (
@@ -10,6 +11,10 @@ from .views import (
     InvitationsForUserListView,
     RejectInvitationView,
 )
+from .async_views import AsyncGroupListCreateView
+
+if settings.ASYNC_READ_VIEWS:
+    GroupListCreateView = AsyncGroupListCreateView
 
 app_name = "groups"
 urlpatterns = [
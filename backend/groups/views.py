@@ -12,11 +12,19 @@ from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.contrib.auth import get_user_model
 
+from core.metrics import EMAIL_SEND_DURATION, EMAIL_SEND_FAILURES
+
 from .invitation_authentication import InvitationAuthentication
 from .models import Groups, Membership, Invitation
 from .serializers import GroupsSerializer, MembershipSerializer, InvitationSerializer
 import secrets
-from .permissions import IsGroupAdmin, IsGroupMember, IsSelfOrAdmin
+from .permissions import (
+    IsGroupAdmin,
+    IsGroupMember,
+    IsSelfOrAdmin,
+    get_group_context,
+    get_group_or_404,
+)
 from expenses.models import GroupBalances
 
 
@@ -55,6 +63,12 @@ class GroupDetailView(
             return [IsAuthenticated(), IsGroupMember()]
         return super().get_permissions()
 
+    def get_object(self):
+        # already loaded by the permission check
+        obj = get_group_or_404(self.request, self)
+        self.check_object_permissions(self.request, obj)
+        return obj
+
     def get(self, request, *args, **kwargs):
         return self.retrieve(request, *args, **kwargs)
 
@@ -88,10 +102,7 @@ class MembersListCreateView(
         return Membership.objects.filter(group_id=group_id)
 
     def get(self, request, *args, **kwargs):
-        group = kwargs.get("pk")
-        try:
-            group = Groups.objects.get(id=group)
-        except Groups.DoesNotExist:
+        if get_group_context(request, self).group is None:
             raise ValidationError("Group Does not exists")
         return self.list(request, *args, **kwargs)
 
@@ -155,7 +166,7 @@ class InvitationView(APIView):
     @transaction.atomic
     def post(self, request, *args, **kwargs):
         member = get_object_or_404(Membership, id=kwargs.get("id"))
-        group = get_object_or_404(Groups, id=kwargs.get("pk"))
+        group = get_group_or_404(request, self)
         token = secrets.token_urlsafe(75)
         invitation = {
             "invited_email": member.email,
@@ -192,15 +203,17 @@ class InvitationView(APIView):
         plain_message = strip_tags(html_message)
         try:
             # use celery and redis for to make email async and fast
-            send_mail(
-                subject,
-                plain_message,
-                settings.EMAIL_HOST_USER,
-                [invited_email],
-                html_message=html_message,
-                fail_silently=False,
-            )
+            with EMAIL_SEND_DURATION.labels("invitation").time():
+                send_mail(
+                    subject,
+                    plain_message,
+                    settings.EMAIL_HOST_USER,
+                    [invited_email],
+                    html_message=html_message,
+                    fail_silently=False,
+                )
         except Exception as e:
+            EMAIL_SEND_FAILURES.labels("invitation").inc()
             return Response({"detail": str(e)})
 
 
@@ -269,6 +282,18 @@ class AcceptInvitationView(APIView):
             )
         with transaction.atomic():
             member = get_object_or_404(Membership, group_id=group.id, email=email)
+            if (
+                Membership.objects.filter(group_id=group.id, user_id=user)
+                .exclude(pk=member.pk)
+                .exists()
+            ):
+                return Response(
+                    {
+                        "code": "ALREADY_MEMBER",
+                        "detail": "You are already a member of this group.",
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             member.user_id = user
             member.verified = True
             if not member.name:
@@ -0,0 +1,16 @@
+"""
+Gunicorn settings shared by the WSGI and ASGI modes of docker/django/start
+(gunicorn loads ./gunicorn.conf.py by itself).
+"""
+
+import os
+
+workers = int(os.getenv("WEB_CONCURRENCY", 3))
+
+
+def child_exit(server, worker):
+    # drop the live gauges (e.g. pool connections) of a worker that is gone
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,159 @@
+"""
+Async versions of the signup, login and password change views.
+
+They answer exactly like users.views but run Argon2 on the bounded hashing
+pool (users.hashing) instead of the request thread, so under ASGI a burst of
+logins no longer blocks every other API call. Enabled with ASYNC_AUTH_VIEWS.
+"""
+
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import CachedJWTAuthentication
+from .hashing import HashingBusy, acheck_password, ahash_password
+from .serializers import CustomUserSerializer, LoginSerializer, PasswordChangeSerializer
+
+User = get_user_model()
+
+
+def parse_json(request):
+    try:
+        return json.loads(request.body or b"{}")
+    except ValueError:
+        return None
+
+
+def busy_response():
+    response = JsonResponse(
+        {"detail": "Too many authentication requests, try again shortly."},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def token_response(refresh, status_code):
+    response = JsonResponse({"access": str(refresh.access_token)}, status=status_code)
+    response.set_cookie(
+        key="refresh_token",
+        value=str(refresh),
+        httponly=True,
+        secure=False,  # Change to True in production (with HTTPS)
+        samesite="Lax",
+        path="/",
+        max_age=7 * 24 * 60 * 60,  # 7 days
+    )
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncRegisterView(View):
+    async def post(self, request, *args, **kwargs):
+        serializer = CustomUserSerializer(data=parse_json(request))
+        # the unique email check queries the database
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            password_hash = await ahash_password(serializer.validated_data["password"])
+        except HashingBusy:
+            return busy_response()
+        usr = await sync_to_async(serializer.save)(password_hash=password_hash)
+        refresh = await sync_to_async(RefreshToken.for_user)(usr)
+        return token_response(refresh, status.HTTP_201_CREATED)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncLoginView(View):
+    async def post(self, request, *args, **kwargs):
+        serializer = LoginSerializer(data=parse_json(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        email = serializer.validated_data["email"]
+        password = serializer.validated_data["password"]
+
+        user = await User.objects.filter(email=email).afirst()
+        try:
+            if user is None:
+                # hash anyway so unknown emails take as long as wrong passwords
+                await ahash_password(password)
+                valid = False
+            else:
+                valid = user.is_active and await acheck_password(
+                    password, user.password
+                )
+        except HashingBusy:
+            return busy_response()
+
+        if not valid:
+            return JsonResponse(
+                {"detail": "Invalid Credentials"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        refresh = await sync_to_async(RefreshToken.for_user)(user)
+        return token_response(refresh, status.HTTP_200_OK)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncPasswordChangeView(View):
+    async def patch(self, request, *args, **kwargs):
+        try:
+            auth = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+        except (AuthenticationFailed, InvalidToken) as e:
+            detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+            return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED)
+        if auth is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        user, _ = auth
+
+        serializer = PasswordChangeSerializer(data=parse_json(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        old_password = serializer.validated_data["old_password"]
+        new_password = serializer.validated_data["new_password"]
+        token = request.COOKIES.get("refresh_token")
+        if not token:
+            return JsonResponse(
+                {"error": "Refresh token not found"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        try:
+            # verifying checks the blacklist table
+            token = await sync_to_async(RefreshToken)(token)
+        except TokenError:
+            return JsonResponse(
+                {"error": "Invalid or expired refresh token"},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        if "password" in user.get_deferred_fields():
+            # authenticated from the cache, which never holds the hash
+            await user.arefresh_from_db(fields=["password"])
+        try:
+            if not await acheck_password(old_password, user.password):
+                return JsonResponse(
+                    {"detail": "Old password Unmatched!"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            password_hash = await ahash_password(new_password)
+        except HashingBusy:
+            return busy_response()
+
+        await sync_to_async(token.blacklist)()  # first blacklisting the refresh token
+        user.password = password_hash
+        await user.asave(update_fields=["password"])
+        return JsonResponse(
+            {"detail": "Password Reset Successfull!"}, status=status.HTTP_200_OK
+        )
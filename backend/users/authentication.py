@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.db_router import pin_reads_if_recent_writer
+
+
+def user_cache_key(user_id):
+    return f"auth-user-fields:{user_id}"
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps what authenticating a user needs in the cache
+    for settings.AUTH_USER_CACHE_TIMEOUT seconds instead of loading the user
+    from the database on every request: its id, is_active and the fingerprint
+    of its password the revoke check compares the token with. Never the user
+    itself, which holds the password hash.
+
+    On a hit the user is rebuilt with every other field deferred, loaded (all
+    at once, CustomUser.refresh_from_db) only by views that read them.
+
+    Only users that passed simplejwt's checks (exists, active) are cached, and
+    saving or deleting a user drops its entry (users.signals). With the
+    default local-memory cache that only clears the current worker, so the
+    timeout is kept short; with REDIS_URL set it clears every worker.
+    """
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+        # before loading the user, which may read from the replica
+        pin_reads_if_recent_writer(user_id)
+
+        key = user_cache_key(user_id)
+        entry = cache.get(key)
+        if entry is None:
+            user = super().get_user(validated_token)
+            entry = {
+                "id": user.pk,
+                "is_active": user.is_active,
+                "password": get_md5_hash_password(user.password),
+            }
+            cache.set(key, entry, settings.AUTH_USER_CACHE_TIMEOUT)
+            return user
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM)
+            != entry["password"]
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        loaded = {"id": entry["id"], "is_active": entry["is_active"]}
+        # from_db takes the values in the model's field order
+        names = [
+            f.attname
+            for f in self.user_model._meta.concrete_fields
+            if f.attname in loaded
+        ]
+        return self.user_model.from_db(None, names, [loaded[n] for n in names])
@@ -0,0 +1,57 @@
+"""
+Bounded thread pool for password hashing.
+
+Argon2 (argon2-cffi) releases the GIL while hashing, so running it on a few
+dedicated threads lets the async auth views (users.async_views) keep serving
+other requests during a burst of logins. PASSWORD_HASHING_WORKERS bounds how
+many hashes run at once and PASSWORD_HASHING_MAX_PENDING how many may be
+queued before new requests are turned away.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+_executor = None
+_pending = None
+_lock = threading.Lock()
+
+
+class HashingBusy(Exception):
+    """Raised when PASSWORD_HASHING_MAX_PENDING hashes are already queued."""
+
+
+def _get_pool():
+    global _executor, _pending
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASHING_WORKERS,
+                thread_name_prefix="password-hashing",
+            )
+            _pending = threading.BoundedSemaphore(settings.PASSWORD_HASHING_MAX_PENDING)
+    return _executor, _pending
+
+
+async def run_hashing(func, *args, **kwargs):
+    executor, pending = _get_pool()
+    if not pending.acquire(blocking=False):
+        raise HashingBusy
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+    finally:
+        pending.release()
+
+
+async def ahash_password(raw_password):
+    return await run_hashing(make_password, raw_password)
+
+
+async def acheck_password(raw_password, encoded):
+    # no setter: hashes are not upgraded from here, that needs a DB write
+    return await run_hashing(check_password, raw_password, encoded)
@@ -14,3 +14,11 @@ class CustomUser(AbstractUser):
 
     def __str__(self):
         return self.name
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        # a user authenticated from the cache (users.authentication) only has
+        # id and is_active: reading any other field loads them all at once
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
@@ -1,3 +1,4 @@
+from django.contrib.auth.hashers import make_password
 from rest_framework import serializers
 
 
@@ -16,10 +17,11 @@ class CustomUserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data["username"] = validated_data.get("email")
         psw = validated_data.pop("password")
-        instance = super().create(validated_data)
-        instance.set_password(psw)
-        instance.save()
-        return instance
+        # the async signup view hashes off the request thread and passes
+        # save(password_hash=...)
+        password_hash = validated_data.pop("password_hash", None)
+        validated_data["password"] = password_hash or make_password(psw)
+        return super().create(validated_data)
 
 
 class LoginSerializer(serializers.Serializer):
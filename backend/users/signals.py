@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache_key
+from .models import CustomUser
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    # password changes, deactivation and profile edits all go through save()
+    cache.delete(user_cache_key(instance.pk))
@@ -1,3 +1,127 @@
-from django.test import TestCase
+import json
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import hashing
+from .authentication import CachedJWTAuthentication, user_cache_key
+from .async_views import AsyncLoginView, AsyncPasswordChangeView, AsyncRegisterView
+from .models import CustomUser
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username="user@example.com",
+            email="user@example.com",
+            name="User",
+            password="old-password",
+        )
+        token = AccessToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.url = reverse("user_profile")
+
+    def test_user_is_loaded_once_then_served_from_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # authenticating takes no query, the profile is then read in one
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["email"], "user@example.com")
+        self.assertEqual(response.data["name"], "User")
+
+    def test_cache_holds_no_password_hash(self):
+        self.client.get(self.url)
+        entry = cache.get(user_cache_key(self.user.pk))
+        self.assertEqual(set(entry), {"id", "is_active", "password"})
+        self.assertEqual(entry["id"], self.user.pk)
+        self.assertNotIn(self.user.password, str(entry))
+
+    def test_deactivation_drops_the_cached_user(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_drops_the_cached_user(self):
+        self.client.get(self.url)
+        self.user.set_password("new-password")
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+
+class AsyncAuthViewTests(TestCase):
+    def setUp(self):
+        self.factory = AsyncRequestFactory()
+        self.user = CustomUser.objects.create_user(
+            username="user@example.com",
+            email="user@example.com",
+            name="User",
+            password="old-password",
+        )
+
+    def post(self, view, data, **extra):
+        request = self.factory.generic(
+            extra.pop("method", "POST"),
+            "/",
+            json.dumps(data),
+            content_type="application/json",
+            **extra,
+        )
+        return async_to_sync(view.as_view())(request)
+
+    def test_login(self):
+        data = {"email": "user@example.com", "password": "old-password"}
+        response = self.post(AsyncLoginView, data)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("access", json.loads(response.content))
+        self.assertIn("refresh_token", response.cookies)
+
+        data["password"] = "wrong"
+        response = self.post(AsyncLoginView, data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        data["email"] = "nobody@example.com"
+        response = self.post(AsyncLoginView, data)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_register_stores_a_hashed_password(self):
+        data = {"email": "new@example.com", "name": "New", "password": "secret-pw"}
+        response = self.post(AsyncRegisterView, data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        user = CustomUser.objects.get(email="new@example.com")
+        self.assertTrue(user.check_password("secret-pw"))
+        response = self.post(AsyncRegisterView, data)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_password_change(self):
+        refresh = RefreshToken.for_user(self.user)
+        # served from the cache, which doesn't hold the password hash
+        CachedJWTAuthentication().get_user(refresh.access_token)
+        self.factory.cookies["refresh_token"] = str(refresh)
+        data = {"old_password": "old-password", "new_password": "new-password"}
+        response = self.post(
+            AsyncPasswordChangeView,
+            data,
+            method="PATCH",
+            headers={"Authorization": f"Bearer {refresh.access_token}"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("new-password"))
+
+    @override_settings(PASSWORD_HASHING_MAX_PENDING=0)
+    def test_busy_pool_answers_503(self):
+        with mock.patch.object(hashing, "_executor", None):
+            data = {"email": "user@example.com", "password": "old-password"}
+            response = self.post(AsyncLoginView, data)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import (
     TokenVerifyView,
@@ -13,6 +14,15 @@ from .views import (
     LogoutView,
     CustomUsersListView,
 )
+from .async_views import AsyncRegisterView, AsyncLoginView, AsyncPasswordChangeView
+
+if settings.ASYNC_AUTH_VIEWS:
+    # hash passwords on the bounded pool instead of the request thread
+    RegisterView, LoginView, PasswordChangeView = (
+        AsyncRegisterView,
+        AsyncLoginView,
+        AsyncPasswordChangeView,
+    )
 
 urlpatterns = [
     path("auth/signup/", RegisterView.as_view(), name="signup"),
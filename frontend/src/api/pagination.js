@@ -0,0 +1,17 @@
+// The expense list and transaction endpoints return cursor pages:
+// { next, previous, results }. `next` is a full url, only its cursor is kept
+// so requests keep going through the api base url.
+export const nextCursor = (page) =>
+  page.next ? new URL(page.next).searchParams.get("cursor") : null;
+
+// Follows every page of `fetchPage(cursor)`, for lists that are always short.
+export const fetchAllPages = async (fetchPage) => {
+  const results = [];
+  let cursor = null;
+  do {
+    const response = await fetchPage(cursor);
+    results.push(...response.data.results);
+    cursor = nextCursor(response.data);
+  } while (cursor);
+  return results;
+};
@@ -11,6 +11,7 @@ const ExpenseSection = ({
   onAddExpense,
   onRecordPayment,
   groupName,
+  onLoadMore,
 }) => {
   const [showAddExpense, setShowAddExpense] = useState(false);
   const [expandedExpense, setExpandedExpense] = useState(null);
@@ -436,6 +437,15 @@ const ExpenseSection = ({
             )}
           </div>
         ))}
+        {onLoadMore && (
+          <button
+            type="button"
+            onClick={onLoadMore}
+            className="w-full py-2 text-sm text-blue-600 hover:text-blue-800 underline underline-offset-2 hover:no-underline"
+          >
+            Load more expenses
+          </button>
+        )}
       </div>
 
       {/* Add Expense Modal */}
@@ -7,6 +7,7 @@ import ErrorMessage from "../components/ErrorMessage";
 import { useError } from "../hooks/useError";
 import { useNotification } from "../hooks/notification";
 import NotificationContainer from "../components/Notification";
+import { fetchAllPages } from "../api/pagination";
 
 const ExpenseDetail = () => {
   const location = useLocation();
@@ -76,11 +77,11 @@ const ExpenseDetail = () => {
   }, [groupId, expenseId]);
   const fetchProposedTransactions = async () => {
     try {
-      const tRes = await expenseService.proposedTransactions(
-        groupId,
-        expenseId
+      // one expense has a handful of records, load all of its pages
+      const transactions = await fetchAllPages((cursor) =>
+        expenseService.proposedTransactions(groupId, expenseId, cursor)
       );
-      setProposedTransactions(tRes.data);
+      setProposedTransactions(transactions);
     } catch (err) {
       setError("Failed to fetch Proposed Transactions.");
     }
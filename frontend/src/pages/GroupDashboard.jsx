@@ -14,6 +14,7 @@ import ErrorMessage from "../components/ErrorMessage";
 import { useError } from "../hooks/useError";
 import { useNotification } from "../hooks/notification";
 import NotificationContainer from "../components/Notification";
+import { nextCursor } from "../api/pagination";
 
 const GroupDashboard = () => {
   const location = useLocation();
@@ -23,6 +24,7 @@ const GroupDashboard = () => {
   const [currentGroup, setCurrentGroup] = useState(null);
   const [members, setMembers] = useState([]);
   const [expenses, setExpenses] = useState([]);
+  const [expensesCursor, setExpensesCursor] = useState(null);
   const [balances, setBalances] = useState([]);
   const [suggestedTransactions, setSuggestedTransactions] = useState([]);
   const [activeSection, setActiveSection] = useState("balances");
@@ -104,20 +106,28 @@ const GroupDashboard = () => {
   const loadExpenseData = async () => {
     try {
       setLoading(true);
-      const [expenseResponse] = await Promise.all([
-        expenseService.listExpense(groupId),
-      ]);
-
-      const sorted_data = expenseResponse.data.sort(
-        (a, b) => new Date(b.created_at) - new Date(a.created_at)
-      );
-      setExpenses(sorted_data);
+      // pages come newest first
+      const expenseResponse = await expenseService.listExpense(groupId);
+      setExpenses(expenseResponse.data.results);
+      setExpensesCursor(nextCursor(expenseResponse.data));
     } catch (err) {
       setError("Failed to load expense data");
     } finally {
       setLoading(false);
     }
   };
+  const loadMoreExpenses = async () => {
+    try {
+      const expenseResponse = await expenseService.listExpense(
+        groupId,
+        expensesCursor
+      );
+      setExpenses((prev) => [...prev, ...expenseResponse.data.results]);
+      setExpensesCursor(nextCursor(expenseResponse.data));
+    } catch (err) {
+      setError("Failed to load expense data");
+    }
+  };
 
   // Add the  handleAddMember function
   const handleAddMember = async (memberData) => {
@@ -336,6 +346,7 @@ const GroupDashboard = () => {
               onAddExpense={handleAddExpense}
               onRecordPayment={() => openPaymentModal()}
               groupName={currentGroup?.name}
+              onLoadMore={expensesCursor ? loadMoreExpenses : null}
             />
           </div>
 
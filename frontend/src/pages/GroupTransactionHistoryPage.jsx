@@ -5,6 +5,7 @@ import { groupService } from "../services/groupService";
 import { useError } from "../hooks/useError";
 import { authService } from "../services/authService";
 import Button from "../components/Button";
+import { nextCursor } from "../api/pagination";
 
 const GroupTransactionHistoryPage = () => {
   const location = useLocation();
@@ -12,6 +13,7 @@ const GroupTransactionHistoryPage = () => {
   const navigate = useNavigate();
 
   const [transactions, setTransactions] = useState([]);
+  const [transactionsCursor, setTransactionsCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const { error: error, setError, clearError } = useError();
   const [refreshing, setRefreshing] = useState(false);
@@ -25,7 +27,8 @@ const GroupTransactionHistoryPage = () => {
       setError(null);
       setRefreshing(true);
       const response = await groupService.groupTransactionHistory(groupId);
-      setTransactions(response.data);
+      setTransactions(response.data.results);
+      setTransactionsCursor(nextCursor(response.data));
     } catch (err) {
       setError(
         err.response?.data?.message || "Failed to fetch transaction history"
@@ -36,6 +39,23 @@ const GroupTransactionHistoryPage = () => {
       setRefreshing(false);
     }
   };
+  const fetchMoreTransactions = async () => {
+    try {
+      setRefreshing(true);
+      const response = await groupService.groupTransactionHistory(
+        groupId,
+        transactionsCursor
+      );
+      setTransactions((prev) => [...prev, ...response.data.results]);
+      setTransactionsCursor(nextCursor(response.data));
+    } catch (err) {
+      setError(
+        err.response?.data?.message || "Failed to fetch transaction history"
+      );
+    } finally {
+      setRefreshing(false);
+    }
+  };
   const fetchMembers = async () => {
     try {
       setRefreshing(true);
@@ -288,6 +308,18 @@ const GroupTransactionHistoryPage = () => {
                 </tbody>
               </table>
             </div>
+            {transactionsCursor && (
+              <div className="px-6 py-3 border-t border-gray-200 text-center">
+                <button
+                  type="button"
+                  onClick={fetchMoreTransactions}
+                  disabled={refreshing}
+                  className="text-sm text-blue-600 hover:text-blue-800 underline underline-offset-2 hover:no-underline disabled:opacity-50"
+                >
+                  Load more transactions
+                </button>
+              </div>
+            )}
           </div>
         )}
 
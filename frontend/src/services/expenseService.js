@@ -4,7 +4,9 @@ export const expenseService = {
   // Expenses
   createExpense: (groupId, expenseData) =>
     api.post(`/groups/${groupId}/expenses/`, expenseData),
-  listExpense: (groupId) => api.get(`/groups/${groupId}/expenses/`),
+  // cursor paginated, pass the cursor of the previous page to get the next
+  listExpense: (groupId, cursor) =>
+    api.get(`/groups/${groupId}/expenses/`, { params: { cursor } }),
   getExpense: (groupId, expenseId) =>
     api.get(`/groups/${groupId}/expenses/${expenseId}/`),
   editExpense: (groupId, expenseId, expenseData) =>
@@ -15,6 +17,8 @@ export const expenseService = {
     api.post(`/groups/${groupId}/settlement/`, paymentData),
   suggestedSettlements: (groupId) =>
     api.get(`/groups/${groupId}/suggested-settlements/`),
-  proposedTransactions: (groupId, expenseId) =>
-    api.get(`/groups/${groupId}/expenses/${expenseId}/transactions/`),
+  proposedTransactions: (groupId, expenseId, cursor) =>
+    api.get(`/groups/${groupId}/expenses/${expenseId}/transactions/`, {
+      params: { cursor },
+    }),
 };
@@ -32,6 +32,7 @@ export const groupService = {
   listInvitationsForUser: () => api.get("groups/invitations/"),
 
   //Transcation-History
-  groupTransactionHistory: (groupId) =>
-    api.get(`/groups/${groupId}/transaction/history/`),
+  // cursor paginated, pass the cursor of the previous page to get the next
+  groupTransactionHistory: (groupId, cursor) =>
+    api.get(`/groups/${groupId}/transaction/history/`, { params: { cursor } }),
 };